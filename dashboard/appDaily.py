@@ -193,7 +193,7 @@ def create_group_performance_table(df, latest_date):
     if latest_data.empty:
         return None
     
-    group_stats = latest_data.groupby('group').agg({
+    group_stats = latest_data.groupby('group', observed=True).agg({
         'view_count': 'sum',
         'post_count': 'sum',
         'like_count': 'sum',
@@ -218,7 +218,7 @@ def create_daily_diff_chart(df, metric, groups=None):
         filtered_df = df
     
     # 使用新的可视化工具
-    daily_diff = filtered_df.groupby(['date', 'group'])[metric].sum().reset_index()
+    daily_diff = filtered_df.groupby(['date', 'group'], observed=True)[metric].sum().reset_index()
     
     # 按 group 分组绘制
     fig = px.line(
@@ -672,7 +672,7 @@ def main():
         # 显示统计信息
         if diff_groups:
             st.markdown("### 📊 分组新增量统计")
-            diff_stats = filtered_df[filtered_df['group'].isin(diff_groups)].groupby('group')[selected_diff_metric].sum().sort_values(ascending=False)
+            diff_stats = filtered_df[filtered_df['group'].isin(diff_groups)].groupby('group', observed=True)[selected_diff_metric].sum().sort_values(ascending=False)
             st.bar_chart(diff_stats)
         
         # 效率分布分析
@@ -717,7 +717,7 @@ def main():
                 if today and daily_clicks_df is not None:
                     today_row = daily_clicks_df[daily_clicks_df['date'] == today]
                     if not today_row.empty:
-                        yesterday = today_row['date'].values[0] - timedelta(days=1)
+                        yesterday = today_row['date'].iloc[0] - timedelta(days=1)
                         yesterday_row = daily_clicks_df[daily_clicks_df['date'] == yesterday]
                         if not yesterday_row.empty:
                             yesterday_metrics = yesterday_row.iloc[0]
@@ -190,14 +190,16 @@ if accounts_df is None or redash_df is None:
     import numpy as np
     from datetime import datetime, timedelta
     
+    rng = np.random.default_rng()
+
     # 模拟 accounts 数据
     st.subheader("📋 创建模拟 Accounts 数据")
     mock_accounts_data = {
         'Tiktok ID': [f'user_{i:03d}' for i in range(1, 21)],
         'Groups': ['yujie_main_avatar'] * 10 + ['wan_produce101'] * 10,
         'username': [f'user_{i:03d}' for i in range(1, 21)],
-        'follower_count': np.random.randint(1000, 100000, 20),
-        'like_count': np.random.randint(100, 10000, 20)
+        'follower_count': rng.integers(1000, 100000, 20),
+        'like_count': rng.integers(100, 10000, 20)
     }
     accounts_df = pd.DataFrame(mock_accounts_data)
     st.write("模拟 accounts 数据:")
@@ -206,26 +208,24 @@ if accounts_df is None or redash_df is None:
     # 模拟 redash 数据
     st.subheader("📋 创建模拟 Redash 数据")
     dates = pd.date_range(start='2025-01-01', end='2025-01-31', freq='D')
-    mock_redash_data = []
-    
-    for date in dates:
-        for user_id in mock_accounts_data['Tiktok ID']:
-            mock_redash_data.append({
-                'date': date,
-                'user_id': user_id,
-                'view_count': np.random.randint(1000, 50000),
-                'like_count': np.random.randint(100, 5000),
-                'comment_count': np.random.randint(10, 500),
-                'share_count': np.random.randint(5, 200),
-                'post_count': np.random.randint(1, 10),
-                'view_diff': np.random.randint(-1000, 5000),
-                'like_diff': np.random.randint(-100, 500),
-                'comment_diff': np.random.randint(-10, 50),
-                'share_diff': np.random.randint(-5, 20),
-                'post_diff': np.random.randint(-1, 3)
-            })
+    users = np.asarray(mock_accounts_data['Tiktok ID'])
+    n_dates, n_users = len(dates), len(users)
+    n_rows = n_dates * n_users
+    redash_df = pd.DataFrame({
+        'date': np.repeat(dates.values, n_users),
+        'user_id': np.tile(users, n_dates),
+        'view_count': rng.integers(1000, 50000, n_rows),
+        'like_count': rng.integers(100, 5000, n_rows),
+        'comment_count': rng.integers(10, 500, n_rows),
+        'share_count': rng.integers(5, 200, n_rows),
+        'post_count': rng.integers(1, 10, n_rows),
+        'view_diff': rng.integers(-1000, 5000, n_rows),
+        'like_diff': rng.integers(-100, 500, n_rows),
+        'comment_diff': rng.integers(-10, 50, n_rows),
+        'share_diff': rng.integers(-5, 20, n_rows),
+        'post_diff': rng.integers(-1, 3, n_rows)
+    })
     
-    redash_df = pd.DataFrame(mock_redash_data)
     st.write("模拟 redash 数据:")
     st.dataframe(redash_df.head())
     
@@ -5,19 +5,33 @@ from datetime import datetime, timedelta, date
 import warnings
 import sys
 import os
+import functools
+import io
+import shutil
+import copy
+import traceback
 import altair as alt
 import requests
-import pickle
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# 调试模式开关，关闭时不在页面上输出调试信息
+DEBUG = st.sidebar.checkbox("调试模式", value=False)
+
+def debug_write(*args):
+    """仅在调试模式下把调试信息输出到页面"""
+    if DEBUG:
+        st.write(*args)
 
 # 环境和数据完整性调试输出
-st.write('Python version:', sys.version)
+debug_write('Python version:', sys.version)
 try:
     import streamlit
-    st.write('Streamlit version:', streamlit.__version__)
+    debug_write('Streamlit version:', streamlit.__version__)
 except Exception as e:
-    st.write('Streamlit import error:', e)
+    debug_write('Streamlit import error:', e)
 
-st.write('Current working dir:', os.getcwd())
+debug_write('Current working dir:', os.getcwd())
 # 自动创建所需的空目录（如果不存在）
 for d in [
     "data",
@@ -28,23 +42,24 @@ for d in [
     os.makedirs(d, exist_ok=True)
 
 # 检查目录内容，使用更健壮的路径处理
-st.write(f'[DEBUG] 当前工作目录: {os.getcwd()}')
-st.write(f'[DEBUG] 当前目录内容: {os.listdir(".")}')
+debug_write(f'[DEBUG] 当前工作目录: {os.getcwd()}')
+debug_write(f'[DEBUG] 当前目录内容: {os.listdir(".")}')
 
-try:
-    if os.path.exists('data'):
-        st.write('Files in data/:', os.listdir('data'))
-        # 检查子目录
-        for subdir in ['redash_data', 'clicks', 'postingManager_data']:
-            subdir_path = os.path.join('data', subdir)
-            if os.path.exists(subdir_path):
-                st.write(f'Files in data/{subdir}/:', os.listdir(subdir_path))
-            else:
-                st.write(f'data/{subdir}/ 目录不存在')
-    else:
-        st.write('data/ 目录不存在')
-except Exception as e:
-    st.write('目录读取失败:', e)
+if DEBUG:
+    try:
+        if os.path.exists('data'):
+            st.write('Files in data/:', os.listdir('data'))
+            # 检查子目录
+            for subdir in ['redash_data', 'clicks', 'postingManager_data']:
+                subdir_path = os.path.join('data', subdir)
+                if os.path.exists(subdir_path):
+                    st.write(f'Files in data/{subdir}/:', os.listdir(subdir_path))
+                else:
+                    st.write(f'data/{subdir}/ 目录不存在')
+        else:
+            st.write('data/ 目录不存在')
+    except Exception as e:
+        st.write('目录读取失败:', e)
 
 # 添加 scripts 目录到 Python 路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -97,9 +112,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-import requests
-import os
-import pandas as pd
+def download_to_buffer(url):
+    """流式下载远程文件到内存缓冲区，直接交给解析器，不再落地临时文件"""
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()  # 检查HTTP错误
+        # 按 Content-Encoding 解压（例如 gzip），与 response.content 行为一致
+        r.raw.decode_content = True
+        buf = io.BytesIO()
+        shutil.copyfileobj(r.raw, buf)
+    buf.seek(0)
+    return buf
 
 @st.cache_data
 def load_accounts_data():
@@ -115,16 +137,16 @@ def load_accounts_data():
         for local_path in possible_paths:
             if os.path.exists(local_path):
                 df = pd.read_excel(local_path)
-                st.write(f"[DEBUG] 本地 accounts_detail.xlsx 加载成功，路径: {local_path}, shape: {df.shape}")
+                debug_write(f"[DEBUG] 本地 accounts_detail.xlsx 加载成功，路径: {local_path}, shape: {df.shape}")
                 return df
         
-        st.write(f"[DEBUG] 尝试的路径: {possible_paths}")
-        st.write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
-        st.write(f"[DEBUG] 当前目录内容: {os.listdir('.')}")
+        debug_write(f"[DEBUG] 尝试的路径: {possible_paths}")
+        debug_write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
+        debug_write(f"[DEBUG] 当前目录内容: {os.listdir('.')}")
         if os.path.exists('data'):
-            st.write(f"[DEBUG] data目录内容: {os.listdir('data')}")
+            debug_write(f"[DEBUG] data目录内容: {os.listdir('data')}")
         else:
-            st.write("[DEBUG] data目录不存在")
+            debug_write("[DEBUG] data目录不存在")
         
         # 如果本地文件不存在，尝试从云端加载
         
@@ -135,14 +157,10 @@ def load_accounts_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/accounts_detail.xlsx"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 accounts_detail.xlsx 到 {tmp_path}")
-            df = pd.read_excel(tmp_path)
-            st.write("[DEBUG] 云端 accounts_detail.xlsx 加载成功，shape:", df.shape)
+            buf = download_to_buffer(url)
+            debug_write(f"[DEBUG] 从 {url} 下载 accounts_detail.xlsx，大小: {buf.getbuffer().nbytes} 字节")
+            df = pd.read_excel(buf)
+            debug_write("[DEBUG] 云端 accounts_detail.xlsx 加载成功，shape:", df.shape)
             return df
         except Exception as e:
             st.error(f"云端数据加载失败: {e}")
@@ -151,6 +169,57 @@ def load_accounts_data():
         st.error(f"账号数据加载失败: {e}")
         return None
 
+@functools.lru_cache(maxsize=8)
+def find_latest_dated_file(data_dir, dir_mtime, prefix, suffix, date_format):
+    """
+    按文件名中的日期查找目录下最新的数据文件
+    
+    结果按 (目录, 目录 mtime) 缓存，目录内容不变时不会重复扫描和解析文件名。
+    调用方需传入 os.path.getmtime(data_dir)。
+    """
+    files = [f for f in os.listdir(data_dir) if f.startswith(prefix) and f.endswith(suffix)]
+    if not files:
+        return None
+    
+    # 文件名中日期部分的长度，例如 '%Y-%m-%d' -> 10，'%Y%m%d' -> 8
+    date_len = len(datetime(2000, 1, 1).strftime(date_format))
+    
+    def extract_date_from_filename(filename):
+        try:
+            date_str = filename[len(prefix):len(prefix) + date_len]
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            # 如果无法解析日期，返回很早的日期
+            return datetime(1900, 1, 1)
+    
+    latest_file = max(files, key=extract_date_from_filename)
+    return os.path.join(data_dir, latest_file)
+
+def downcast_numeric_columns(df):
+    """数值列降为 int32/float32，减少内存占用（ID 类列保持原精度；float32 存不下的列保持 float64）"""
+    int32_info = np.iinfo(np.int32)
+    for col in df.select_dtypes(include='int64').columns:
+        if str(col).lower().endswith('id'):
+            continue
+        if df[col].between(int32_info.min, int32_info.max).all():
+            df[col] = df[col].astype('int32')
+    for col in df.select_dtypes(include='float64').columns:
+        if str(col).lower().endswith('id'):
+            continue
+        # 含空值的计数列也是 float64，超过 2^24 的值转 float32 会被舍入，由 to_numeric 判断能否无损降精度
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    return df
+
+def prepare_redash_df(df):
+    """加载后统一整理 redash 数据的列类型"""
+    # 加载时一次性按固定格式解析日期，避免后续反复推断
+    if 'date' in df.columns:
+        try:
+            df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', cache=True)
+        except (ValueError, TypeError):
+            df['date'] = pd.to_datetime(df['date'], errors='coerce', cache=True)
+    return downcast_numeric_columns(df)
+
 def load_redash_data():
     try:
         # 动态查找最新的 redash 数据文件
@@ -164,33 +233,25 @@ def load_redash_data():
             
             for data_dir in possible_dirs:
                 if os.path.exists(data_dir):
-                    redash_files = [f for f in os.listdir(data_dir) 
-                                  if f.startswith('redash_data_') and f.endswith('.csv')]
-                    if redash_files:
-                        # 基于文件名中的日期选择最新文件
-                        def extract_date_from_filename(filename):
-                            try:
-                                date_str = filename.replace('redash_data_', '').replace('.csv', '')
-                                return pd.to_datetime(date_str)
-                            except:
-                                return pd.to_datetime('1900-01-01')
-                        
-                        latest_file = max(redash_files, key=extract_date_from_filename)
-                        return os.path.join(data_dir, latest_file)
+                    latest_file = find_latest_dated_file(
+                        data_dir, os.path.getmtime(data_dir), 'redash_data_', '.csv', '%Y-%m-%d'
+                    )
+                    if latest_file:
+                        return latest_file
             return None
         
         latest_file_path = find_latest_redash_file()
         if latest_file_path:
-            df = pd.read_csv(latest_file_path)
-            st.write(f"[DEBUG] 本地 redash 数据加载成功，文件: {os.path.basename(latest_file_path)}, shape: {df.shape}")
+            df = prepare_redash_df(pd.read_csv(latest_file_path))
+            debug_write(f"[DEBUG] 本地 redash 数据加载成功，文件: {os.path.basename(latest_file_path)}, shape: {df.shape}")
             return df
         
-        st.write(f"[DEBUG] 未找到本地 redash 数据文件")
-        st.write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
+        debug_write(f"[DEBUG] 未找到本地 redash 数据文件")
+        debug_write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
         if os.path.exists('data/redash_data'):
-            st.write(f"[DEBUG] data/redash_data目录内容: {os.listdir('data/redash_data')}")
+            debug_write(f"[DEBUG] data/redash_data目录内容: {os.listdir('data/redash_data')}")
         else:
-            st.write("[DEBUG] data/redash_data目录不存在")
+            debug_write("[DEBUG] data/redash_data目录不存在")
         
         # 如果本地文件不存在，尝试从云端加载
         
@@ -201,14 +262,10 @@ def load_redash_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/redash_data.csv"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 redash_data.csv 到 {tmp_path}")
-            df = pd.read_csv(tmp_path)
-            st.write("[DEBUG] 云端 redash_data.csv 加载成功，shape:", df.shape)
+            buf = download_to_buffer(url)
+            debug_write(f"[DEBUG] 从 {url} 下载 redash_data.csv，大小: {buf.getbuffer().nbytes} 字节")
+            df = prepare_redash_df(pd.read_csv(buf))
+            debug_write("[DEBUG] 云端 redash_data.csv 加载成功，shape:", df.shape)
             return df
         except Exception as e:
             st.error(f"云端数据加载失败: {e}")
@@ -217,6 +274,21 @@ def load_redash_data():
         st.error(f"Redash数据加载失败: {e}")
         return None
 
+def prepare_clicks_df(df):
+    """加载后统一整理 clicks 数据的列类型"""
+    # 加载时一次性解析时间戳并派生 date 列
+    if 'timestamp' in df.columns:
+        try:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', cache=True)
+        except (ValueError, TypeError):
+            df['timestamp'] = pd.to_datetime(df['timestamp'], cache=True)
+        df['date'] = df['timestamp'].dt.date
+    # 低基数字符串列转为 category，减少内存并加快 groupby/筛选
+    for col in ('page_type', 'page_url', 'session_id'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return downcast_numeric_columns(df)
+
 def load_clicks_data():
     try:
         # 动态查找最新的 clicks 数据文件
@@ -230,33 +302,25 @@ def load_clicks_data():
             
             for data_dir in possible_dirs:
                 if os.path.exists(data_dir):
-                    clicks_files = [f for f in os.listdir(data_dir) 
-                                  if f.endswith('.csv')]
-                    if clicks_files:
-                        # 基于文件名中的日期选择最新文件
-                        def extract_date_from_clicks_filename(filename):
-                            try:
-                                date_str = filename[:8]  # 取前8位作为日期
-                                return pd.to_datetime(date_str, format='%Y%m%d')
-                            except:
-                                return pd.to_datetime('1900-01-01')
-                        
-                        latest_file = max(clicks_files, key=extract_date_from_clicks_filename)
-                        return os.path.join(data_dir, latest_file)
+                    latest_file = find_latest_dated_file(
+                        data_dir, os.path.getmtime(data_dir), '', '.csv', '%Y%m%d'
+                    )
+                    if latest_file:
+                        return latest_file
             return None
         
         latest_file_path = find_latest_clicks_file()
         if latest_file_path:
-            df = pd.read_csv(latest_file_path)
-            st.write(f"[DEBUG] 本地 clicks 数据加载成功，文件: {os.path.basename(latest_file_path)}, shape: {df.shape}")
+            df = prepare_clicks_df(pd.read_csv(latest_file_path))
+            debug_write(f"[DEBUG] 本地 clicks 数据加载成功，文件: {os.path.basename(latest_file_path)}, shape: {df.shape}")
             return df
         
-        st.write(f"[DEBUG] 未找到本地 clicks 数据文件")
-        st.write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
+        debug_write(f"[DEBUG] 未找到本地 clicks 数据文件")
+        debug_write(f"[DEBUG] 当前工作目录: {os.getcwd()}")
         if os.path.exists('data/clicks'):
-            st.write(f"[DEBUG] data/clicks目录内容: {os.listdir('data/clicks')}")
+            debug_write(f"[DEBUG] data/clicks目录内容: {os.listdir('data/clicks')}")
         else:
-            st.write("[DEBUG] data/clicks目录不存在")
+            debug_write("[DEBUG] data/clicks目录不存在")
         
         # 如果本地文件不存在，尝试从云端加载
         
@@ -267,14 +331,10 @@ def load_clicks_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/clicks.csv"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 clicks.csv 到 {tmp_path}")
-            df = pd.read_csv(tmp_path)
-            st.write("[DEBUG] 云端 clicks.csv 加载成功，shape:", df.shape)
+            buf = download_to_buffer(url)
+            debug_write(f"[DEBUG] 从 {url} 下载 clicks.csv，大小: {buf.getbuffer().nbytes} 字节")
+            df = prepare_clicks_df(pd.read_csv(buf))
+            debug_write("[DEBUG] 云端 clicks.csv 加载成功，shape:", df.shape)
             return df
         except Exception as e:
             st.error(f"云端数据加载失败: {e}")
@@ -286,27 +346,27 @@ def load_clicks_data():
 # 数据加载和错误处理
 try:
     accounts_df = load_accounts_data()
-    st.write(f"[DEBUG] accounts_df shape: {accounts_df.shape if accounts_df is not None else 'None'}")
+    debug_write(f"[DEBUG] accounts_df shape: {accounts_df.shape if accounts_df is not None else 'None'}")
     if accounts_df is not None:
-        st.write(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
+        debug_write(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
 except Exception as e:
     st.error(f"❌ 账号数据加载失败: {e}")
     accounts_df = None
 
 try:
     redash_df = load_redash_data()
-    st.write(f"[DEBUG] redash_df shape: {redash_df.shape if redash_df is not None else 'None'}")
+    debug_write(f"[DEBUG] redash_df shape: {redash_df.shape if redash_df is not None else 'None'}")
     if redash_df is not None:
-        st.write(f"[DEBUG] redash_df columns: {redash_df.columns.tolist()}")
+        debug_write(f"[DEBUG] redash_df columns: {redash_df.columns.tolist()}")
 except Exception as e:
     st.error(f"❌ Redash数据加载失败: {e}")
     redash_df = None
 
 try:
     clicks_df = load_clicks_data()
-    st.write(f"[DEBUG] clicks_df shape: {clicks_df.shape if clicks_df is not None else 'None'}")
+    debug_write(f"[DEBUG] clicks_df shape: {clicks_df.shape if clicks_df is not None else 'None'}")
     if clicks_df is not None:
-        st.write(f"[DEBUG] clicks_df columns: {clicks_df.columns.tolist()}")
+        debug_write(f"[DEBUG] clicks_df columns: {clicks_df.columns.tolist()}")
 except Exception as e:
     st.error(f"❌ 点击数据加载失败: {e}")
     clicks_df = None
@@ -330,57 +390,53 @@ if accounts_df is None or redash_df is None or clicks_df is None:
         st.info("💡 本地数据文件不存在，创建模拟数据进行演示")
         
         # 创建模拟数据
-        import numpy as np
-        from datetime import datetime, timedelta
-        
+        # 统一的随机数生成器
+        rng = np.random.default_rng()
+
         # 模拟 accounts 数据
         mock_accounts_data = {
             'Tiktok ID': [f'user_{i:03d}' for i in range(1, 21)],
             'Groups': ['yujie_main_avatar'] * 10 + ['wan_produce101'] * 10,
             'username': [f'user_{i:03d}' for i in range(1, 21)],
-            'follower_count': np.random.randint(1000, 100000, 20),
-            'like_count': np.random.randint(100, 10000, 20)
+            'follower_count': rng.integers(1000, 100000, 20),
+            'like_count': rng.integers(100, 10000, 20)
         }
         accounts_df = pd.DataFrame(mock_accounts_data)
         
-        # 模拟 redash 数据
+        # 模拟 redash 数据（按列一次性生成，避免逐行构造 dict）
         dates = pd.date_range(start='2025-01-01', end='2025-01-31', freq='D')
-        mock_redash_data = []
-        
-        for date in dates:
-            for user_id in mock_accounts_data['Tiktok ID']:
-                mock_redash_data.append({
-                    'date': date,
-                    'user_id': user_id,
-                    'view_count': np.random.randint(1000, 50000),
-                    'like_count': np.random.randint(100, 5000),
-                    'comment_count': np.random.randint(10, 500),
-                    'share_count': np.random.randint(5, 200),
-                    'post_count': np.random.randint(1, 10),
-                    'view_diff': np.random.randint(-1000, 5000),
-                    'like_diff': np.random.randint(-100, 500),
-                    'comment_diff': np.random.randint(-10, 50),
-                    'share_diff': np.random.randint(-5, 20),
-                    'post_diff': np.random.randint(-1, 3)
-                })
-        
-        redash_df = pd.DataFrame(mock_redash_data)
+        users = np.asarray(mock_accounts_data['Tiktok ID'])
+        n_dates, n_users = len(dates), len(users)
+        n_rows = n_dates * n_users
+        redash_df = pd.DataFrame({
+            'date': np.repeat(dates.values, n_users),
+            'user_id': np.tile(users, n_dates),
+            'view_count': rng.integers(1000, 50000, n_rows),
+            'like_count': rng.integers(100, 5000, n_rows),
+            'comment_count': rng.integers(10, 500, n_rows),
+            'share_count': rng.integers(5, 200, n_rows),
+            'post_count': rng.integers(1, 10, n_rows),
+            'view_diff': rng.integers(-1000, 5000, n_rows),
+            'like_diff': rng.integers(-100, 500, n_rows),
+            'comment_diff': rng.integers(-10, 50, n_rows),
+            'share_diff': rng.integers(-5, 20, n_rows),
+            'post_diff': rng.integers(-1, 3, n_rows)
+        })
         
         # 模拟 clicks 数据
-        mock_clicks_data = []
-        for date in dates[:10]:  # 只创建前10天的点击数据
-            for _ in range(np.random.randint(50, 200)):  # 每天50-200次点击
-                mock_clicks_data.append({
-                    'date': date.date(),
-                    'timestamp': date,
-                    'session_id': f'session_{np.random.randint(1, 1000)}',
-                    'visitor_id': f'visitor_{np.random.randint(1, 500)}',
-                    'page_url': np.random.choice(['https://insnap.ai/videos', 'https://insnap.ai/zh/download']),
-                    'page_type': np.random.choice(['videos', 'download']),
-                    'view_diff': np.random.randint(1, 100)
-                })
-        
-        clicks_df = pd.DataFrame(mock_clicks_data)
+        click_dates = dates[:10]  # 只创建前10天的点击数据
+        clicks_per_day = rng.integers(50, 200, len(click_dates))  # 每天50-200次点击
+        n_clicks = int(clicks_per_day.sum())
+        click_timestamps = pd.DatetimeIndex(np.repeat(click_dates.values, clicks_per_day))
+        clicks_df = pd.DataFrame({
+            'date': click_timestamps.date,
+            'timestamp': click_timestamps,
+            'session_id': 'session_' + pd.Series(rng.integers(1, 1000, n_clicks)).astype(str),
+            'visitor_id': 'visitor_' + pd.Series(rng.integers(1, 500, n_clicks)).astype(str),
+            'page_url': rng.choice(['https://insnap.ai/videos', 'https://insnap.ai/zh/download'], n_clicks),
+            'page_type': rng.choice(['videos', 'download'], n_clicks),
+            'view_diff': rng.integers(1, 100, n_clicks)
+        })
         
         st.info("💡 使用模拟数据进行演示。请确保本地数据文件存在：")
         st.info("📁 data/postingManager_data/accounts_detail.xlsx")
@@ -398,37 +454,40 @@ if 'clicks_df' not in st.session_state:
     st.session_state.clicks_df = None
 
 # 调试 session_state 状态
-st.write("[DEBUG] === Session State 调试信息 ===")
-st.write(f"[DEBUG] st.session_state.merge_successful: {st.session_state.get('merge_successful', False)}")
-st.write(f"[DEBUG] st.session_state.merged_df 是否为 None: {st.session_state.get('merged_df') is None}")
-st.write(f"[DEBUG] st.session_state.group_mapping 是否为 None: {st.session_state.get('group_mapping') is None}")
-st.write(f"[DEBUG] st.session_state.clicks_df 是否为 None: {st.session_state.get('clicks_df') is None}")
+debug_write("[DEBUG] === Session State 调试信息 ===")
+debug_write(f"[DEBUG] st.session_state.merge_successful: {st.session_state.get('merge_successful', False)}")
+debug_write(f"[DEBUG] st.session_state.merged_df 是否为 None: {st.session_state.get('merged_df') is None}")
+debug_write(f"[DEBUG] st.session_state.group_mapping 是否为 None: {st.session_state.get('group_mapping') is None}")
+debug_write(f"[DEBUG] st.session_state.clicks_df 是否为 None: {st.session_state.get('clicks_df') is None}")
 if st.session_state.get('merged_df') is not None:
-    st.write(f"[DEBUG] st.session_state.merged_df shape: {st.session_state.get('merged_df').shape}")
-st.write("[DEBUG] === Session State 调试信息结束 ===")
+    debug_write(f"[DEBUG] st.session_state.merged_df shape: {st.session_state.get('merged_df').shape}")
+debug_write("[DEBUG] === Session State 调试信息结束 ===")
 
 # === 自动检测数据文件变化，必要时清空合并结果 ===
 def get_file_mtime(path):
-    return os.path.getmtime(path) if os.path.exists(path) else 0
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
 
 # 你可以根据实际情况调整这些路径
 file1 = os.path.join(os.path.dirname(__file__), '..', 'data', 'posts_detail.xlsx')
 file2_dir = os.path.join(os.path.dirname(__file__), '..', 'data', 'redash_data')
 file2 = None
-if os.path.exists(file2_dir):
-    redash_files = [f for f in os.listdir(file2_dir) if f.startswith('redash_data_') and f.endswith('.csv')]
-    if redash_files:
-        # 取最新日期的文件
-        def extract_date_from_filename(filename):
-            try:
-                date_str = filename.replace('redash_data_', '').replace('.csv', '')
-                return pd.to_datetime(date_str)
-            except:
-                return pd.to_datetime('1900-01-01')
-        latest_file = max(redash_files, key=extract_date_from_filename)
-        file2 = os.path.join(file2_dir, latest_file)
-
-current_mtime = (get_file_mtime(file1), get_file_mtime(file2) if file2 else 0)
+file2_mtime = 0
+try:
+    # 一次 scandir 拿到目录项，DirEntry.stat() 结果会被缓存
+    with os.scandir(file2_dir) as it:
+        redash_entries = [e for e in it if e.name.startswith('redash_data_') and e.name.endswith('.csv')]
+except OSError:
+    redash_entries = []
+if redash_entries:
+    # 文件名中的日期为 ISO 格式，按字符串比较即可取到最新日期的文件
+    latest_entry = max(redash_entries, key=lambda e: e.name)
+    file2 = latest_entry.path
+    file2_mtime = latest_entry.stat().st_mtime
+
+current_mtime = (get_file_mtime(file1), file2_mtime)
 
 if "last_mtime" not in st.session_state or st.session_state["last_mtime"] != current_mtime:
     st.session_state.pop("merged_df", None)
@@ -446,62 +505,104 @@ try:
     processor = EnhancedTikTokDataProcessor(
         accounts_df=accounts_df,
         redash_df=redash_df,
-        clicks_df=clicks_df
+        clicks_df=clicks_df,
+        debug=DEBUG
     )
-    st.write("[DEBUG] EnhancedTikTokDataProcessor 初始化成功")
+    debug_write("[DEBUG] EnhancedTikTokDataProcessor 初始化成功")
 except Exception as e:
     st.error(f"❌ 数据处理器初始化失败: {e}")
     st.stop()
 
 # 检查是否之前已经成功合并
-st.write("[DEBUG] 检查 session_state 条件...")
-st.write(f"[DEBUG] st.session_state.merge_successful: {st.session_state.get('merge_successful', False)}")
-st.write(f"[DEBUG] st.session_state.merged_df is not None: {st.session_state.get('merged_df') is not None}")
-st.write(f"[DEBUG] 条件结果: {st.session_state.get('merge_successful', False) and st.session_state.get('merged_df') is not None}")
-
-MERGED_PATH = '/tmp/merged_result.parquet'
-GROUP_MAPPING_PATH = '/tmp/group_mapping.pkl'
-CLICKS_PATH = '/tmp/clicks_df.parquet'
-
-# 启动时优先加载持久化合并结果
-if os.path.exists(MERGED_PATH):
+debug_write("[DEBUG] 检查 session_state 条件...")
+debug_write(f"[DEBUG] st.session_state.merge_successful: {st.session_state.get('merge_successful', False)}")
+debug_write(f"[DEBUG] st.session_state.merged_df is not None: {st.session_state.get('merged_df') is not None}")
+debug_write(f"[DEBUG] 条件结果: {st.session_state.get('merge_successful', False) and st.session_state.get('merged_df') is not None}")
+
+def save_state(path, **tables):
+    """将多个 DataFrame 依次写成 Arrow IPC 流，合并保存到同一个 /tmp 临时文件（LZ4 压缩）
+
+    每个表的名称记录在其 schema 元数据中，值为 None 的表不写入。
+    """
+    options = pa.ipc.IpcWriteOptions(compression='lz4')
+    with pa.OSFile(path, 'wb') as sink:
+        for name, df in tables.items():
+            if df is None:
+                continue
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'table_name': name.encode()})
+            with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
+
+@st.cache_data(show_spinner=False)
+def load_state(path, mtime, columns=None):
+    """读取 save_state 写入的临时文件（内存映射），返回 {表名: DataFrame}，以文件修改时间作为缓存键
+
+    columns 为 {表名: 需要的列}，只把这些列转换为 DataFrame；未列出的表读取全部列。
+    """
+    columns = columns or {}
+    tables = {}
+    with pa.memory_map(path) as source:
+        while source.tell() < source.size():
+            table = pa.ipc.open_stream(source).read_all()
+            name = table.schema.metadata[b'table_name'].decode()
+            if name in columns:
+                table = table.select([col for col in columns[name] if col in table.column_names])
+            tables[name] = table.to_pandas()
+    return tables
+
+STATE_PATH = '/tmp/dashboard_state.arrow'
+# 重新加载时各表实际用到的列；merged_df 会在"原始数据"页整表导出，因此保留全部列
+STATE_COLUMNS = {
+    'group_mapping': ('user_id', 'group'),
+    'clicks_df': ('timestamp', 'session_id', 'visitor_id', 'page_url', 'page_type', 'date'),
+}
+
+# 优先复用本会话 session_state 中的合并结果，其次加载持久化文件，最后才重新合并
+if st.session_state.get('merge_successful') and st.session_state.get('merged_df') is not None:
+    processor.merged_df = st.session_state.merged_df
+    processor.date_min, processor.date_max = st.session_state.date_range
+    processor.group_mapping = st.session_state.group_mapping
+    if st.session_state.clicks_df is not None:
+        processor.clicks_df = st.session_state.clicks_df
+    merge_result = True
+elif os.path.exists(STATE_PATH):
     st.success("✅ 已加载持久化的合并结果，无需重新合并")
-    merged_df = pd.read_parquet(MERGED_PATH)
-    processor.merged_df = merged_df
-    # group_mapping
-    if os.path.exists(GROUP_MAPPING_PATH):
-        with open(GROUP_MAPPING_PATH, 'rb') as f:
-            processor.group_mapping = pickle.load(f)
-    # clicks_df
-    if os.path.exists(CLICKS_PATH):
-        processor.clicks_df = pd.read_parquet(CLICKS_PATH)
+    state = load_state(STATE_PATH, get_file_mtime(STATE_PATH), STATE_COLUMNS)
+    processor.merged_df = state['merged_df']
+    processor.update_date_range()
+    # group_mapping / clicks_df
+    if 'group_mapping' in state:
+        processor.group_mapping = state['group_mapping']
+    if 'clicks_df' in state:
+        processor.clicks_df = state['clicks_df']
     merge_result = True
 else:
     # 合并数据
     try:
-        st.write("[DEBUG] 开始调用 merge_data()...")
-        st.write(f"[DEBUG] processor.redash_df shape: {processor.redash_df.shape if processor.redash_df is not None else 'None'}")
-        st.write(f"[DEBUG] processor.accounts_df shape: {processor.accounts_df.shape if processor.accounts_df is not None else 'None'}")
-        st.write(f"[DEBUG] processor.clicks_df shape: {processor.clicks_df.shape if processor.clicks_df is not None else 'None'}")
+        debug_write("[DEBUG] 开始调用 merge_data()...")
+        debug_write(f"[DEBUG] processor.redash_df shape: {processor.redash_df.shape if processor.redash_df is not None else 'None'}")
+        debug_write(f"[DEBUG] processor.accounts_df shape: {processor.accounts_df.shape if processor.accounts_df is not None else 'None'}")
+        debug_write(f"[DEBUG] processor.clicks_df shape: {processor.clicks_df.shape if processor.clicks_df is not None else 'None'}")
         
         # 强制刷新输出
-        st.write("[DEBUG] 即将调用 merge_data()，请等待...")
+        debug_write("[DEBUG] 即将调用 merge_data()，请等待...")
         
         merge_result = processor.merge_data()
         
-        st.write(f"[DEBUG] merge_data() 返回值: {merge_result}")
-        st.write(f"[DEBUG] merge_data() 完成，merged_df shape: {processor.merged_df.shape if processor.merged_df is not None else 'None'}")
+        debug_write(f"[DEBUG] merge_data() 返回值: {merge_result}")
+        debug_write(f"[DEBUG] merge_data() 完成，merged_df shape: {processor.merged_df.shape if processor.merged_df is not None else 'None'}")
         
         if not merge_result:
             st.error("❌ merge_data() 返回 False，合并失败")
-            st.write("[DEBUG] 请检查上面的调试信息，找出合并失败的具体原因")
+            debug_write("[DEBUG] 请检查上面的调试信息，找出合并失败的具体原因")
             
             # 尝试获取更多调试信息
-            st.write("[DEBUG] 尝试检查 processor 状态...")
-            st.write(f"[DEBUG] processor.redash_df 是否为 None: {processor.redash_df is None}")
-            st.write(f"[DEBUG] processor.accounts_df 是否为 None: {processor.accounts_df is None}")
-            st.write(f"[DEBUG] processor.clicks_df 是否为 None: {processor.clicks_df is None}")
-            st.write(f"[DEBUG] processor.merged_df 是否为 None: {processor.merged_df is None}")
+            debug_write("[DEBUG] 尝试检查 processor 状态...")
+            debug_write(f"[DEBUG] processor.redash_df 是否为 None: {processor.redash_df is None}")
+            debug_write(f"[DEBUG] processor.accounts_df 是否为 None: {processor.accounts_df is None}")
+            debug_write(f"[DEBUG] processor.clicks_df 是否为 None: {processor.clicks_df is None}")
+            debug_write(f"[DEBUG] processor.merged_df 是否为 None: {processor.merged_df is None}")
             
             # 提供直接测试选项
             st.write("### 🔧 调试选项")
@@ -518,61 +619,64 @@ else:
                     st.stop()
                 
                 # 创建 group_mapping
-                st.write("[DEBUG] 创建 group_mapping...")
+                debug_write("[DEBUG] 创建 group_mapping...")
                 try:
                     accounts_df['Tiktok ID'] = accounts_df['Tiktok ID'].astype(str)
                     group_mapping = accounts_df[['Tiktok ID', 'Groups']].drop_duplicates()
                     group_mapping = group_mapping.rename(columns={'Tiktok ID': 'user_id', 'Groups': 'group'})
                     group_mapping['user_id'] = group_mapping['user_id'].astype(str)
                     group_mapping['group'] = group_mapping['group'].fillna('Unknown')
-                    st.write(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
+                    debug_write(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
                 except Exception as e:
                     st.error(f"❌ 创建 group_mapping 失败: {str(e)}")
                     st.stop()
                 
                 # 处理日期列
-                st.write("[DEBUG] 处理日期列...")
+                debug_write("[DEBUG] 处理日期列...")
                 try:
                     if 'date' not in redash_df.columns and 'YMDdate' in redash_df.columns:
-                        redash_df['date'] = pd.to_datetime(redash_df['YMDdate'], errors='coerce')
-                    redash_df = redash_df.dropna(subset=['date'])
-                    st.write(f"[DEBUG] 处理日期后 shape: {redash_df.shape}")
+                        redash_df['date'] = processor.parse_date_column(redash_df['YMDdate'])
+                    # 与 merge_data 一致：已是 datetime 的列不再解析，否则按固定格式走快速路径
+                    if not pd.api.types.is_datetime64_any_dtype(redash_df['date']):
+                        redash_df['date'] = processor.parse_date_column(redash_df['date'])
+                    # 加载时已解析并剔除无效日期，这里只在仍有 NaT 时才过滤
+                    if redash_df['date'].hasnans:
+                        redash_df = redash_df.loc[redash_df['date'].notna()]
+                    debug_write(f"[DEBUG] 处理日期后 shape: {redash_df.shape}")
                 except Exception as e:
                     st.error(f"❌ 处理日期列失败: {str(e)}")
                     st.stop()
                 
                 # 执行合并
-                st.write("[DEBUG] 执行合并...")
+                debug_write("[DEBUG] 执行合并...")
                 try:
                     # 确保 user_id 列的数据类型一致
-                    st.write(f"[DEBUG] redash_df['user_id'] dtype: {redash_df['user_id'].dtype}")
-                    st.write(f"[DEBUG] group_mapping['user_id'] dtype: {group_mapping['user_id'].dtype}")
+                    debug_write(f"[DEBUG] redash_df['user_id'] dtype: {redash_df['user_id'].dtype}")
+                    debug_write(f"[DEBUG] group_mapping['user_id'] dtype: {group_mapping['user_id'].dtype}")
                     
                     # 将 redash_df 的 user_id 转换为字符串
                     redash_df['user_id'] = redash_df['user_id'].astype(str)
-                    st.write(f"[DEBUG] 转换后 redash_df['user_id'] dtype: {redash_df['user_id'].dtype}")
+                    debug_write(f"[DEBUG] 转换后 redash_df['user_id'] dtype: {redash_df['user_id'].dtype}")
                     
-                    merged_df = redash_df.merge(group_mapping, on='user_id', how='left')
-                    st.write(f"[DEBUG] 合并成功，shape: {merged_df.shape}")
+                    group_lookup = processor.get_group_lookup(group_mapping)
+                    merged_df = redash_df.assign(group=redash_df['user_id'].map(group_lookup).fillna('Unknown'))
+                    debug_write(f"[DEBUG] 合并成功，shape: {merged_df.shape}")
                     
                     # 更新 processor
                     processor.merged_df = merged_df
+                    processor.update_date_range()
                     processor.group_mapping = group_mapping
                     processor.clicks_df = clicks_df
                     
                     # 持久化保存
-                    merged_df.to_parquet('/tmp/merged_result.parquet')
-                    import pickle
-                    with open('/tmp/group_mapping.pkl', 'wb') as f:
-                        pickle.dump(group_mapping, f)
-                    if clicks_df is not None:
-                        clicks_df.to_parquet('/tmp/clicks_df.parquet')
+                    save_state(STATE_PATH, merged_df=merged_df, group_mapping=group_mapping, clicks_df=clicks_df)
 
                     st.success("✅ 直接合并测试成功！")
                     
                     # 使用 session_state 来标记合并成功
                     st.session_state.merge_successful = True
                     st.session_state.merged_df = merged_df
+                    st.session_state.date_range = (processor.date_min, processor.date_max)
                     st.session_state.group_mapping = group_mapping
                     st.session_state.clicks_df = clicks_df
                     
@@ -590,22 +694,30 @@ else:
             
                 except Exception as e:
                     st.error(f"❌ 合并失败: {str(e)}")
-                    import traceback
                     st.error(f"详细错误: {traceback.format_exc()}")
             
             st.stop()
             
     except Exception as e:
         st.error(f"❌ 数据合并失败: {e}")
-        st.write(f"[DEBUG] 异常详情: {str(e)}")
-        import traceback
+        debug_write(f"[DEBUG] 异常详情: {str(e)}")
         st.error(f"[DEBUG] 完整错误堆栈: {traceback.format_exc()}")
         st.stop()
 
-if processor.merged_df is None or processor.merged_df.empty:
+# 合并/加载完成后统一取一次 merged_df，后续渲染只使用这个绑定
+merged_df = processor.merged_df
+if merged_df is None or merged_df.empty:
     st.error("❌ 数据合并后为空，请检查数据文件内容")
     st.stop()
 
+# 记录到 session_state，本会话后续 rerun 不再读盘或重新合并
+if not st.session_state.get('merge_successful'):
+    st.session_state.merge_successful = True
+    st.session_state.merged_df = merged_df
+    st.session_state.date_range = (processor.date_min, processor.date_max)
+    st.session_state.group_mapping = processor.group_mapping
+    st.session_state.clicks_df = processor.clicks_df
+
 # 获取数据摘要
 summary = processor.get_data_summary()
 
@@ -614,48 +726,50 @@ latest_increments = processor.get_latest_day_increment_metrics()
 if latest_increments:
     summary['latest_day_increments'] = latest_increments
 
+# 初始化可视化工具
+viz = EnhancedVisualization()
+
 # 显示数据摘要卡片
 if summary:
     st.markdown("### 📊 数据概览")
-    summary_html = EnhancedVisualization().create_summary_cards(summary)
+    summary_html = viz.create_summary_cards(summary)
     st.markdown(summary_html, unsafe_allow_html=True)
 
 # 侧边栏 - 筛选器
 st.sidebar.header("📋 筛选设置")
 
 # 日期范围选择
-if processor.merged_df is not None:
-    # Debug: 显示 merged_df['date'] 的唯一值和类型
-    st.sidebar.write(f"DEBUG: merged_df['date'] unique: {processor.merged_df['date'].unique()}")
-    st.sidebar.write(f"DEBUG: merged_df['date'] dtype: {processor.merged_df['date'].dtype}")
-
-    min_date = processor.merged_df['date'].min()
-    max_date = processor.merged_df['date'].max()
+# Debug: 显示 merged_df['date'] 的类型
+if DEBUG:
+    st.sidebar.write(f"DEBUG: merged_df['date'] dtype: {merged_df['date'].dtype}")
+
+# 日期范围在合并/加载时已计算一次
+min_date = processor.date_min
+max_date = processor.date_max
+if DEBUG:
     st.sidebar.write(f"DEBUG: min_date={min_date} ({type(min_date)}), max_date={max_date} ({type(max_date)})")
-    # 修复 NaT 问题
-    if pd.isna(min_date) or min_date is pd.NaT:
-        min_date = date.today()
-    if pd.isna(max_date) or max_date is pd.NaT:
-        max_date = date.today()
-    if isinstance(min_date, pd.Timestamp):
-        min_date = min_date.date()
-    if isinstance(max_date, pd.Timestamp):
-        max_date = max_date.date()
+# 修复 NaT 问题
+if pd.isna(min_date):
+    min_date = date.today()
+if pd.isna(max_date):
+    max_date = date.today()
+if isinstance(min_date, pd.Timestamp):
+    min_date = min_date.date()
+if isinstance(max_date, pd.Timestamp):
+    max_date = max_date.date()
+if DEBUG:
     st.sidebar.write(f"DEBUG: after convert, min_date={min_date}, max_date={max_date}")
-    date_range = st.sidebar.date_input(
-        "选择日期范围",
-        value=(min_date, max_date),
-        min_value=min_date,
-        max_value=max_date
-    )
+date_range = st.sidebar.date_input(
+    "选择日期范围",
+    value=(min_date, max_date),
+    min_value=min_date,
+    max_value=max_date
+)
 
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        end_date_str = end_date.strftime('%Y-%m-%d')
-    else:
-        start_date_str = None
-        end_date_str = None
+if len(date_range) == 2:
+    start_date, end_date = date_range
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
 else:
     start_date_str = None
     end_date_str = None
@@ -669,10 +783,6 @@ selected_groups = st.sidebar.multiselect(
     help="可以选择多个分组进行对比分析"
 )
 
-# 主要内容区域
-if processor.merged_df is None or processor.merged_df.empty:
-    st.warning("所选筛选条件下没有数据")
-
 # 创建标签页
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "📊 基础分析",
@@ -683,9 +793,6 @@ tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "📋 数据详情"
 ])
 
-# 初始化可视化工具
-viz = EnhancedVisualization()
-
 with tab1:
     st.markdown("### 📊 基础信息展示")
 
@@ -745,74 +852,34 @@ with tab1:
     )
 
     if not top_accounts.empty:
-        # 格式化数据用于显示
-        display_df = top_accounts.copy()
-
-        # 创建可点击的用户名列
-        display_df['用户名'] = display_df.apply(
-            lambda row: f"[{row['username']}]({row['profile_url']})" if row['username'] != '未知' and row['profile_url'] else row['username'],
-            axis=1
+        # 格式化数据用于显示：数字保持数值类型，千分位和链接由前端渲染
+        # 列子集本身已是新表，所有列通过 assign 一次生成，无需先 copy 再逐列改写
+        count_cols = ['last_day_view_increment', 'follower_count', 'like_count']
+        # 没有主页（用户名为“未知”或链接为空）的账号不显示链接，用户名列仍照常显示
+        has_profile = (top_accounts['username'].astype(str) != '未知') & (top_accounts['profile_url'].astype(str) != '')
+        display_df = top_accounts[['username', 'profile_url', 'user_id', *count_cols]].assign(
+            username=top_accounts['username'].astype(str),
+            profile_url=top_accounts['profile_url'].where(has_profile),
+            user_id=top_accounts['user_id'].astype(str),
+            **{col: pd.to_numeric(top_accounts[col], errors='coerce').fillna(0).astype('int64') for col in count_cols}
         )
 
-        # 格式化数字字段
-        for col in ['last_day_view_increment', 'follower_count', 'like_count']:
-            if col in display_df.columns:
-                # 先转换为数值，处理NaN，然后格式化
-                numeric_series = pd.to_numeric(display_df[col], errors='coerce')
-                numeric_series = numeric_series.fillna(0)
-                display_df[col] = numeric_series.astype(int).apply(lambda x: f"{x:,}")
-
-        # 重命名列用于显示
-        display_df = display_df.rename(columns={
-            'user_id': '账号 ID',
-            'last_day_view_increment': '最后一天新增浏览量',
-            'follower_count': '总粉丝数',
-            'like_count': '点赞数'
-        })
-
-        # 选择显示的列
-        display_columns = ['用户名', '账号 ID', '最后一天新增浏览量', '总粉丝数', '点赞数']
-        display_df = display_df[display_columns]
-
-        # 显示表格
-        st.markdown("""
-        <style>
-        .dataframe {
-            font-size: 14px;
-        }
-        .dataframe th {
-            background-color: #f0f2f6;
-            font-weight: bold;
-            text-align: center;
-        }
-        .dataframe td {
-            text-align: center;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-
-        # 使用st.markdown显示表格，支持链接点击
         st.markdown("#### 📋 账号表现排名")
 
-        # 创建表格头部
-        table_header = "| 用户名 | 账号 ID | 最后一天新增浏览量 | 总粉丝数 | 点赞数 |\n"
-        table_separator = "|--------|---------|-------------------|----------|--------|\n"
-
-        # 创建表格内容
-        table_rows = []
-        for _, row in display_df.iterrows():
-            username = row['用户名']
-            user_id = row['账号 ID']
-            view_increment = row['最后一天新增浏览量']
-            followers = row['总粉丝数']
-            likes = row['点赞数']
-            table_rows.append(f"| {username} | {user_id} | {view_increment} | {followers} | {likes} |")
-
-        # 组合完整表格
-        full_table = table_header + table_separator + "\n".join(table_rows)
-
-        # 显示表格
-        st.markdown(full_table)
+        # 用户名为普通文本列，主页链接单独一列
+        st.dataframe(
+            display_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'username': st.column_config.TextColumn('用户名'),
+                'profile_url': st.column_config.LinkColumn('TikTok 主页', display_text='打开主页'),
+                'user_id': st.column_config.TextColumn('账号 ID'),
+                'last_day_view_increment': st.column_config.NumberColumn('最后一天新增浏览量', format='%,d'),
+                'follower_count': st.column_config.NumberColumn('总粉丝数', format='%,d'),
+                'like_count': st.column_config.NumberColumn('点赞数', format='%,d')
+            }
+        )
 
         # 添加说明
         st.markdown("""
@@ -821,7 +888,7 @@ with tab1:
         📝 <strong>说明：</strong><br>
         • 最后一天新增浏览量：基于选定日期范围内最后一天的 view_diff 字段<br>
         • 总粉丝数/点赞数：来自 accounts_detail 表的最新数据<br>
-        • 用户名：点击可跳转到 TikTok 主页<br>
+        • TikTok 主页：点击可跳转到账号主页（没有主页的账号留空）<br>
         • 数据范围：当前筛选的日期范围
         </small>
         </div>
@@ -845,22 +912,30 @@ with tab2:
         ("post_count_inc", "新增发帖数", "#9467bd", "条")
     ]
 
-    def create_increment_chart(data, metric_col, title, color, unit):
-        """创建单个新增指标图表"""
-        import altair as alt
-
-        # 计算数据范围，设置自适应纵轴
-        min_value = data[metric_col].min()
-        max_value = data[metric_col].max()
+    def get_increment_domains(data):
+        """一次聚合算出所有新增指标的最小/最大值，换算为各图表的自适应纵轴范围"""
+        metric_cols = [config[0] for config in metric_configs]
+        extents = data[metric_cols].agg(['min', 'max'])
+        domains = {}
+        for metric_col in metric_cols:
+            min_value = extents.at['min', metric_col]
+            max_value = extents.at['max', metric_col]
+
+            # 设置纵轴范围，避免从0开始，增强趋势可读性
+            if min_value != max_value:
+                data_range = max_value - min_value
+                y_min = max(0, min_value - data_range * 0.05)  # 最小不低于0
+                y_max = max_value + data_range * 0.05
+            else:
+                y_min = max(0, min_value * 0.95)
+                y_max = max_value * 1.05
+            domains[metric_col] = (float(y_min), float(y_max))
+        return domains
 
-        # 设置纵轴范围，避免从0开始，增强趋势可读性
-        if min_value != max_value:
-            data_range = max_value - min_value
-            y_min = max(0, min_value - data_range * 0.05)  # 最小不低于0
-            y_max = max_value + data_range * 0.05
-        else:
-            y_min = max(0, min_value * 0.95)
-            y_max = max_value * 1.05
+    @st.cache_data(show_spinner=False)
+    def create_increment_chart(data, metric_col, title, color, unit, y_domain):
+        """创建单个新增指标图表（按数据和参数缓存，相同输入不重复构建图表）"""
+        y_min, y_max = y_domain
 
         chart = alt.Chart(data).mark_line(point=True, color=color).encode(
             x=alt.X('date:T', title='日期'),
@@ -882,6 +957,7 @@ with tab2:
         if not inc_df.empty:
             st.markdown("### 📊 所有账号每日新增指标")
             st.markdown("*以下图表展示基于 redash_data 计算的每日新增数据*")
+            y_domains = get_increment_domains(inc_df)
 
             # 创建两列布局展示图表
             for i in range(0, len(metric_configs), 2):
@@ -889,20 +965,20 @@ with tab2:
 
                 with col1:
                     metric_col, title, color, unit = metric_configs[i]
-                    chart = create_increment_chart(inc_df, metric_col, title, color, unit)
+                    chart = create_increment_chart(inc_df, metric_col, title, color, unit, y_domains[metric_col])
                     st.altair_chart(chart, use_container_width=True)
 
                 # 如果还有下一个指标，在第二列显示
                 if i + 1 < len(metric_configs):
                     with col2:
                         metric_col, title, color, unit = metric_configs[i + 1]
-                        chart = create_increment_chart(inc_df, metric_col, title, color, unit)
+                        chart = create_increment_chart(inc_df, metric_col, title, color, unit, y_domains[metric_col])
                         st.altair_chart(chart, use_container_width=True)
 
             # 如果指标数量是奇数，最后一个指标单独占一行
             if len(metric_configs) % 2 == 1:
                 metric_col, title, color, unit = metric_configs[-1]
-                chart = create_increment_chart(inc_df, metric_col, title, color, unit)
+                chart = create_increment_chart(inc_df, metric_col, title, color, unit, y_domains[metric_col])
                 st.altair_chart(chart, use_container_width=True)
 
         else:
@@ -910,7 +986,7 @@ with tab2:
 
     else:
         # 分组模式
-        all_groups = processor.get_available_groups()
+        all_groups = available_groups
         selected_groups = st.multiselect(
             "选择分组关键词（模糊匹配）",
             options=all_groups,
@@ -962,32 +1038,47 @@ with tab2:
                 inc_df = processor.get_group_daily_increment_metrics(start_date_str, end_date_str, selected_groups)
 
             if not inc_df.empty:
-                # 为每个分组关键词创建图表
+                # 所有分组 × 指标合并为一张分面图，只构建并传输一次图表
+                metric_titles = {metric_col: title for metric_col, title, _, _ in metric_configs}
+                group_inc_df = inc_df[inc_df['group'].isin(selected_groups)]
+                present_groups = set(group_inc_df['group'].unique())
                 for group_keyword in selected_groups:
-                    st.markdown(f"#### 🎯 分组: {group_keyword}")
-
-                    # 筛选该分组的数据
-                    group_data = inc_df[inc_df['group'] == group_keyword].copy()
-                    if not group_data.empty:
-                        # 创建两列布局展示图表
-                        for i in range(0, len(metric_configs), 2):
-                            col1, col2 = st.columns(2)
-
-                            with col1:
-                                metric_col, title, color, unit = metric_configs[i]
-                                chart = create_increment_chart(group_data, metric_col, f"{group_keyword} - {title}", color, unit)
-                                st.altair_chart(chart, use_container_width=True)
-
-                            # 如果还有下一个指标，在第二列显示
-                            if i + 1 < len(metric_configs):
-                                with col2:
-                                    metric_col, title, color, unit = metric_configs[i + 1]
-                                    chart = create_increment_chart(group_data, metric_col, f"{group_keyword} - {title}", color, unit)
-                                    st.altair_chart(chart, use_container_width=True)
-                    else:
+                    if group_keyword not in present_groups:
                         st.warning(f"分组 '{group_keyword}' 暂无数据")
 
-                    st.markdown("---")  # 分隔线
+                if not group_inc_df.empty:
+                    long_df = group_inc_df.melt(
+                        id_vars=['date', 'group'],
+                        value_vars=list(metric_titles),
+                        var_name='metric',
+                        value_name='value'
+                    )
+                    long_df['metric'] = long_df['metric'].map(metric_titles)
+
+                    facet_chart = alt.Chart(long_df).mark_line(point=True).encode(
+                        x=alt.X('date:T', title='日期'),
+                        y=alt.Y('value:Q', title='每日新增', scale=alt.Scale(zero=False)),
+                        color=alt.Color('metric:N', legend=None, scale=alt.Scale(
+                            domain=list(metric_titles.values()),
+                            range=[color for _, _, color, _ in metric_configs]
+                        )),
+                        tooltip=[
+                            alt.Tooltip('date:T', title='日期', format='%Y-%m-%d'),
+                            alt.Tooltip('group:N', title='分组'),
+                            alt.Tooltip('metric:N', title='指标'),
+                            alt.Tooltip('value:Q', title='新增', format=',.0f')
+                        ]
+                    ).properties(
+                        width=200,
+                        height=200
+                    ).facet(
+                        row=alt.Row('group:N', title='分组', sort=selected_groups),
+                        column=alt.Column('metric:N', title=None, sort=list(metric_titles.values()))
+                    ).resolve_scale(
+                        y='independent'
+                    )
+
+                    st.altair_chart(facet_chart)
             else:
                 st.info("无数据或所选分组无数据")
         else:
@@ -1087,7 +1178,7 @@ with tab3:
 with tab4:
     st.markdown("### 🎯 转化分析")
 
-    if processor.clicks_df is not None and processor.merged_df is not None:
+    if processor.clicks_df is not None:
         # 获取最后一天的点击统计摘要
         last_day_summary = processor.get_last_day_clicks_summary(
             start_date=start_date_str,
@@ -1188,269 +1279,305 @@ with tab4:
         else:
             st.warning("暂无转化分析数据")
 
+# 链接分析图表的 Vega-Lite 模板：每个链接只深拷贝后修改标题和纵轴范围，
+# 直接交给 st.vega_lite_chart，跳过 Altair 对象构建和 schema 校验
+
+# 所有链接的 PV/UV 趋势按 link_url 分行分面，放在同一个 spec 中，每个链接的纵轴独立；
+# PV/UV 由 type 字段直接映射颜色，不在前端逐行过滤
+PV_UV_SPEC = {
+    'title': '📈 PV vs UV 趋势对比',
+    'facet': {
+        'row': {'field': 'link_url', 'type': 'nominal', 'title': None,
+                'header': {'labelOrient': 'top', 'labelAnchor': 'start', 'labelFontSize': 13}}
+    },
+    'spec': {
+        'width': 700,
+        'height': 300,
+        'mark': {'type': 'line', 'point': True, 'strokeWidth': 2},
+        'encoding': {
+            'x': {'field': 'date', 'type': 'temporal', 'title': '日期', 'axis': {'format': '%Y-%m-%d'}},
+            'y': {'field': 'value', 'type': 'quantitative', 'title': '点击量/访客数', 'axis': {'format': ','}},
+            'color': {'field': 'type', 'type': 'nominal', 'title': None, 'legend': {'orient': 'top'},
+                      'scale': {'domain': ['点击量(PV)', '访客数(UV)'], 'range': ['#1f77b4', '#ff7f0e']}},
+            'tooltip': [
+                {'field': 'date', 'type': 'temporal', 'title': '日期', 'format': '%Y-%m-%d'},
+                {'field': 'type', 'type': 'nominal', 'title': '类型'},
+                {'field': 'value', 'type': 'quantitative', 'title': '数值', 'format': ',.0f'}
+            ]
+        }
+    },
+    'resolve': {'scale': {'y': 'independent'}},
+    'config': {'axis': {'gridColor': '#f0f0f0'}, 'view': {'strokeWidth': 0}}
+}
+
+VIEWS_SPEC = {
+    'height': 300,
+    'mark': {'type': 'line', 'color': '#2ca02c', 'point': True, 'strokeWidth': 2},
+    'encoding': {
+        'x': {'field': 'date', 'type': 'temporal', 'title': '日期'},
+        'y': {'field': 'daily_views', 'type': 'quantitative', 'title': '每日浏览量',
+              'scale': {'domain': [0, 1]}, 'axis': {'format': ','}},
+        'tooltip': [
+            {'field': 'date', 'type': 'temporal', 'title': '日期', 'format': '%Y-%m-%d'},
+            {'field': 'daily_views', 'type': 'quantitative', 'title': '浏览量', 'format': ',.0f'}
+        ]
+    }
+}
+
+CONVERSION_SPEC = {
+    'height': 300,
+    'mark': {'type': 'line', 'point': True, 'strokeWidth': 2},
+    'encoding': {
+        'x': {'field': 'date', 'type': 'temporal', 'title': '日期'},
+        'y': {'field': 'rate', 'type': 'quantitative', 'title': '转化率 (%)', 'scale': {'domain': [0, 1]}},
+        'color': {'field': 'type', 'type': 'nominal', 'title': '转化率类型'},
+        'tooltip': [
+            {'field': 'date', 'type': 'temporal', 'title': '日期', 'format': '%Y-%m-%d'},
+            {'field': 'rate', 'type': 'quantitative', 'title': '转化率', 'format': '.2f'},
+            {'field': 'type', 'type': 'nominal', 'title': '类型'}
+        ]
+    }
+}
+
 with tab5:
     st.markdown("## 📊 链接点击量 & 转化率分析")
+    # 下载文件名中的日期每次运行只取一次，所有链接共用
+    today_str = datetime.now().strftime('%Y%m%d')
+
+    @st.cache_data(show_spinner=False)
+    def load_link_conversion_analysis(_processor, data_key, start_date, end_date):
+        """按数据指纹和日期范围缓存链接转化分析，切换图表选项等交互时不重新计算"""
+        return _processor.get_link_conversion_analysis(start_date=start_date, end_date=end_date)
+
+    @st.cache_data(show_spinner=False)
+    def prep_link_frames(data):
+        """由单个链接的每日数据构建 PV/UV 长表和转化率长表（按数据内容缓存）"""
+        # 长表直接由 numpy 数组拼出：日期重复两遍，类型用分类编码，数值首尾相接
+        # 图表数据只保留编码用到的列（date/type/value），减少发送到前端的数据量
+        n = len(data)
+        dates = np.tile(data['date'].to_numpy(), 2)
+        type_codes = np.repeat(np.array([0, 1], dtype='int8'), n)
+        combined_data = pd.DataFrame({
+            'date': dates,
+            'type': pd.Categorical.from_codes(type_codes, categories=['点击量(PV)', '访客数(UV)']),
+            'value': np.concatenate([data['daily_clicks'].to_numpy(), data['daily_visitors'].to_numpy()])
+        })
+        conversion_data = pd.DataFrame({
+            'date': dates,
+            'type': pd.Categorical.from_codes(type_codes, categories=['PV转化率', 'UV转化率']),
+            'rate': np.concatenate([
+                data['daily_pv_conversion_rate'].to_numpy(), data['daily_uv_conversion_rate'].to_numpy()
+            ])
+        })
+        return combined_data, conversion_data
+
+    @functools.lru_cache(maxsize=None)
+    def link_file_slug(link_url):
+        """把链接转成可用于文件名的片段，每个链接只计算一次"""
+        return link_url.replace('https://', '').replace('/', '_')
+
+    @st.cache_data(show_spinner=False)
+    def link_csv_bytes(display_data):
+        """用 PyArrow 的 CSV 写入器生成下载内容，按数据内容缓存，同一份数据只序列化一次"""
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(
+            pa.Table.from_pandas(display_data, preserve_index=False),
+            sink,
+            write_options=pa_csv.WriteOptions(quoting_style='needed')
+        )
+        return sink.getvalue().to_pybytes()
+
+    @st.fragment
+    def render_pv_uv_chart(chart_data, link_order):
+        """渲染所有链接的 PV/UV 分面趋势图；切换 PV/UV 只重跑该片段"""
+        chosen_types = st.multiselect(
+            "选择要显示的 PV/UV 指标",
+            options=["点击量(PV)", "访客数(UV)"],
+            default=["点击量(PV)", "访客数(UV)"],
+            key="pv_uv_chart_types"
+        )
+        if not chosen_types:
+            st.info("请至少选择一个 PV/UV 指标")
+            return
+
+        # type 为类别列，isin 只比较类别编码
+        spec = copy.deepcopy(PV_UV_SPEC)
+        spec['facet']['row']['sort'] = link_order
+        st.vega_lite_chart(chart_data[chart_data['type'].isin(chosen_types)], spec)
+
+    @st.fragment
+    def render_link_charts(link_url, data):
+        """渲染单个链接的指标选择、每日明细和趋势图表；切换指标只重跑该片段，不重建统计卡片和下载数据"""
+        # 图表显示选择
+        st.markdown("### 📈 趋势图表")
+        # PV/UV 趋势在上方所有链接共用的分面图中选择，这里只控制本链接的浏览量和转化率图表
+        chart_options = st.multiselect(
+            "选择要显示的指标",
+            options=["浏览量", "PV转化率", "UV转化率"],
+            default=["浏览量"],
+            key=f"link_chart_options_{link_url}"
+        )
 
-    if processor.clicks_df is not None and processor.merged_df is not None:
-        # 获取链接转化率分析数据
-        link_conversion_data = processor.get_link_conversion_analysis(
-            start_date=start_date_str,
-            end_date=end_date_str
+        # 每日数据表格
+        st.markdown("#### 📋 每日数据明细")
+
+        # 准备表格数据：计数列已是 int64（可按数值排序），千分位由前端按列格式渲染
+        table_data = data[['date', 'daily_clicks', 'daily_visitors', 'daily_views']].rename(columns={
+            'date': '日期',
+            'daily_clicks': '点击量(PV)',
+            'daily_visitors': '访客数(UV)',
+            'daily_views': '浏览量'
+        })
+        count_cols = ['点击量(PV)', '访客数(UV)', '浏览量']
+
+        # 显示表格
+        st.dataframe(
+            table_data,
+            use_container_width=True,
+            hide_index=True,
+            column_config={col: st.column_config.NumberColumn(col, format='%,d') for col in count_cols}
         )
 
-        if link_conversion_data:
-            st.markdown("### 🔗 链接映射关系")
-            st.markdown("""
-            - `https://insnap.ai/videos` → 目标分组：`yujie_main_avatar`
-            - `https://insnap.ai/zh/download` → 目标分组：`wan_produce101`
-            """)
+        # 添加表格说明
+        st.markdown("""
+        <div style='background-color: #f8f9fa; padding: 10px; border-radius: 5px; margin-top: 10px;'>
+        <small>
+        📝 <strong>数据说明：</strong><br>
+        • 点击量(PV)：基于不同 session_id 统计的每日点击次数<br>
+        • 访客数(UV)：基于不同 visitor_id 统计的每日独立访客数<br>
+        • 浏览量(View)：基于 view_diff 字段计算的每日浏览量增量<br>
+        • 图表显示：三条折线在同一坐标系中对比，便于观察趋势关系<br>
+        • 数据范围：当前筛选的日期范围
+        </small>
+        </div>
+        """, unsafe_allow_html=True)
 
-            # 为每个链接创建分析图表
-            for link_url, analysis_data in link_conversion_data.items():
-                st.markdown(f"#### 🎯 {link_url}")
-                st.markdown(f"*目标分组: {analysis_data['target_group']}*")
-
-                # 确保data为DataFrame
-                data = analysis_data['data'].copy()
-                required_cols = ['date', 'daily_clicks', 'daily_visitors', 'daily_views']
-                if not isinstance(data, pd.DataFrame) or data.empty:
-                    st.error('数据为空或格式不正确，请检查数据源。')
-                    st.stop()
-                missing_cols = [col for col in required_cols if col not in data.columns]
-                if missing_cols:
-                    st.error(f'数据缺少必要字段: {missing_cols}')
-                    st.stop()
+        # 浏览量图表
+        if "浏览量" in chart_options:
+            st.markdown("#### 📊 每日浏览量趋势")
+            spec = copy.deepcopy(VIEWS_SPEC)
+            spec['title'] = f"📊 {link_url} - 每日浏览量趋势"
+            spec['encoding']['y']['scale']['domain'] = [0, float(data['daily_views'].max() * 1.1)]
 
-                # 显示统计信息卡片
-                col1, col2, col3, col4, col5 = st.columns(5)
-                with col1:
-                    st.metric("总点击量(PV)", f"{analysis_data['total_clicks']:,}")
-                with col2:
-                    st.metric("总访客数(UV)", f"{analysis_data['total_visitors']:,}")
-                with col3:
-                    st.metric("总浏览量", f"{analysis_data['total_views']:,}")
-                with col4:
-                    st.metric("PV转化率", f"{analysis_data['avg_pv_conversion_rate']:.2f}%")
-                with col5:
-                    st.metric("UV转化率", f"{analysis_data['avg_uv_conversion_rate']:.2f}%")
-
-                # 新增：今日新增卡片
-                today = analysis_data.get('today', {})
-                st.markdown(f"#### 📅 今日新增（{today.get('date', '')}）")
-                col1, col2, col3, col4, col5 = st.columns(5)
-                with col1:
-                    st.metric("今日新增点击量(PV)", f"{today.get('pv', 0):,}")
-                with col2:
-                    st.metric("今日新增访客数(UV)", f"{today.get('uv', 0):,}")
-                with col3:
-                    st.metric("今日新增浏览量", f"{today.get('views', 0):,}")
-                with col4:
-                    st.metric("今日PV转化率", f"{today.get('pv_rate', 0.0):.2f}%")
-                with col5:
-                    st.metric("今日UV转化率", f"{today.get('uv_rate', 0.0):.2f}%")
-
-                # 调试输出
-                with st.expander("🔍 调试数据"):
-                    st.write("原始数据样本:")
-                    st.dataframe(analysis_data['data'].head(), use_container_width=True)
-                    st.write(f"数据形状: {analysis_data['data'].shape}")
-                    st.write(f"列名: {list(analysis_data['data'].columns)}")
-
-                # 图表显示选择
-                st.markdown("### 📈 趋势图表")
-                chart_options = st.multiselect(
-                    "选择要显示的指标",
-                    options=["点击量(PV)", "访客数(UV)", "浏览量", "PV转化率", "UV转化率"],
-                    default=["点击量(PV)", "访客数(UV)", "浏览量"],
-                    key=f"chart_options_{link_url}"
-                )
+            st.vega_lite_chart(data[['date', 'daily_views']], spec, use_container_width=True)
 
-                # 创建双轴图表：PV和UV对比
-                import altair as alt
+        # 转化率图表
+        if "PV转化率" in chart_options or "UV转化率" in chart_options:
+            st.markdown("#### 📊 转化率趋势")
 
-                # 构建PV/UV趋势图所需数据
-                required_cols = ['date', 'daily_clicks']
-                missing_cols = [col for col in required_cols if col not in data.columns]
-                if missing_cols:
-                    st.error(f'数据缺少必要字段: {missing_cols}')
-                    st.stop()
-                pv_data = data[['date', 'daily_clicks']].copy()
-                pv_data['type'] = '点击量(PV)'
-                pv_data['value'] = pv_data['daily_clicks']
-                uv_data = data[['date', 'daily_visitors']].copy()
-                uv_data['type'] = '访客数(UV)'
-                uv_data['value'] = uv_data['daily_visitors']
-                combined_data = pd.concat([pv_data, uv_data], ignore_index=True)
-                base = alt.Chart(combined_data).encode(
-                    x=alt.X('date:T', title='日期', axis=alt.Axis(format='%Y-%m-%d'))
-                )
+            conversion_data = prep_link_frames(data)[1]
 
-                # 只保留PV/UV两线趋势图
-                pv_chart = base.transform_filter(alt.datum.type == '点击量(PV)').mark_line(
-                    color='#1f77b4', point=True, strokeWidth=2
-                ).encode(
-                    y=alt.Y('value:Q', title='点击量/访客数',
-                            scale=alt.Scale(domain=[0, max(1, combined_data[combined_data['type'].isin(['点击量(PV)','访客数(UV)'])]['value'].max() * 1.1)]),
-                            axis=alt.Axis(format=',')),
-                    tooltip=[
-                        alt.Tooltip('date:T', title='日期', format='%Y-%m-%d'),
-                        alt.Tooltip('value:Q', title='点击量(PV)', format=',.0f')
-                    ]
-                )
-                uv_chart = base.transform_filter(alt.datum.type == '访客数(UV)').mark_line(
-                    color='#ff7f0e', point=True, strokeWidth=2
-                ).encode(
-                    y=alt.Y('value:Q', title='点击量/访客数',
-                            scale=alt.Scale(domain=[0, max(1, combined_data[combined_data['type'].isin(['点击量(PV)','访客数(UV)'])]['value'].max() * 1.1)]),
-                            axis=alt.Axis(format=',')),
-                    tooltip=[
-                        alt.Tooltip('date:T', title='日期', format='%Y-%m-%d'),
-                        alt.Tooltip('value:Q', title='访客数(UV)', format=',.0f')
-                    ]
-                )
+            # 筛选选中的转化率类型（type 为类别列，isin 只比较类别编码）
+            chosen_types = [t for t in ('PV转化率', 'UV转化率') if t in chart_options]
+            filtered_conversion_data = conversion_data[conversion_data['type'].isin(chosen_types)]
 
-                chart = alt.layer(pv_chart, uv_chart).resolve_scale(
-                    y='independent'
-                ).properties(
-                    title=f"📈 {link_url} - PV vs UV 趋势对比",
-                    height=400
-                ).configure_axis(
-                    gridColor='#f0f0f0'
-                ).configure_view(
-                    strokeWidth=0
-                )
+            spec = copy.deepcopy(CONVERSION_SPEC)
+            spec['title'] = f"📊 {link_url} - 转化率趋势"
+            spec['encoding']['y']['scale']['domain'] = [0, float(filtered_conversion_data['rate'].max() * 1.1)]
 
-                st.altair_chart(chart, use_container_width=True)
+            st.vega_lite_chart(filtered_conversion_data, spec, use_container_width=True)
 
-                # 每日数据表格
-                st.markdown("#### 📋 每日数据明细")
-
-                # 准备表格数据
-                table_data = data[['date', 'daily_clicks', 'daily_visitors', 'daily_views']].copy()
-                table_data = table_data.rename(columns={
-                    'date': '日期',
-                    'daily_clicks': '点击量(PV)',
-                    'daily_visitors': '访客数(UV)',
-                    'daily_views': '浏览量'
-                })
-
-                # 格式化数字显示
-                table_data['点击量(PV)'] = table_data['点击量(PV)'].apply(lambda x: f"{int(x):,}")
-                table_data['访客数(UV)'] = table_data['访客数(UV)'].apply(lambda x: f"{int(x):,}")
-                table_data['浏览量'] = table_data['浏览量'].apply(lambda x: f"{int(x):,}")
-
-                # 显示表格
-                st.dataframe(
-                    table_data,
-                    use_container_width=True,
-                    hide_index=True
-                )
+    @st.fragment
+    def render_link_section(link_url, analysis_data):
+        """渲染单个链接的分析区块，交互时只重跑该链接对应的片段"""
+        st.markdown(f"#### 🎯 {link_url}")
+        st.markdown(f"*目标分组: {analysis_data['target_group']}*")
 
-                # 添加表格说明
-                st.markdown("""
-                <div style='background-color: #f8f9fa; padding: 10px; border-radius: 5px; margin-top: 10px;'>
-                <small>
-                📝 <strong>数据说明：</strong><br>
-                • 点击量(PV)：基于不同 session_id 统计的每日点击次数<br>
-                • 访客数(UV)：基于不同 visitor_id 统计的每日独立访客数<br>
-                • 浏览量(View)：基于 view_diff 字段计算的每日浏览量增量<br>
-                • 图表显示：三条折线在同一坐标系中对比，便于观察趋势关系<br>
-                • 数据范围：当前筛选的日期范围
-                </small>
-                </div>
-                """, unsafe_allow_html=True)
-
-            # 浏览量图表
-            if "浏览量" in chart_options:
-                st.markdown("#### 📊 每日浏览量趋势")
-                views_chart = alt.Chart(data).mark_line(
-                    color='#2ca02c', point=True, strokeWidth=2
-                ).encode(
-                    x=alt.X('date:T', title='日期'),
-                    y=alt.Y('daily_views:Q', title='每日浏览量',
-                           scale=alt.Scale(domain=[0, data['daily_views'].max() * 1.1]),
-                           axis=alt.Axis(format=',')),
-                    tooltip=[
-                        alt.Tooltip('date:T', title='日期', format='%Y-%m-%d'),
-                        alt.Tooltip('daily_views:Q', title='浏览量', format=',.0f')
-                    ]
-                ).properties(
-                    title=f"📊 {link_url} - 每日浏览量趋势",
-                    height=300
-                )
+        # get_link_conversion_analysis 保证 data 为包含所需列的 DataFrame，这里只需处理无数据的情况
+        # （缓存返回的已是独立副本，且下面只读不写，无需再 copy）
+        data = analysis_data['data']
+        if data.empty:
+            st.error('数据为空，请检查数据源或日期范围。')
+            st.markdown("---")
+            return
 
-                st.altair_chart(views_chart, use_container_width=True)
+        # 显示统计信息卡片
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("总点击量(PV)", f"{analysis_data['total_clicks']:,}")
+        with col2:
+            st.metric("总访客数(UV)", f"{analysis_data['total_visitors']:,}")
+        with col3:
+            st.metric("总浏览量", f"{analysis_data['total_views']:,}")
+        with col4:
+            st.metric("PV转化率", f"{analysis_data['avg_pv_conversion_rate']:.2f}%")
+        with col5:
+            st.metric("UV转化率", f"{analysis_data['avg_uv_conversion_rate']:.2f}%")
+
+        # 新增：今日新增卡片
+        today = analysis_data.get('today', {})
+        st.markdown(f"#### 📅 今日新增（{today.get('date', '')}）")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("今日新增点击量(PV)", f"{today.get('pv', 0):,}")
+        with col2:
+            st.metric("今日新增访客数(UV)", f"{today.get('uv', 0):,}")
+        with col3:
+            st.metric("今日新增浏览量", f"{today.get('views', 0):,}")
+        with col4:
+            st.metric("今日PV转化率", f"{today.get('pv_rate', 0.0):.2f}%")
+        with col5:
+            st.metric("今日UV转化率", f"{today.get('uv_rate', 0.0):.2f}%")
+
+        # 调试输出
+        with st.expander("🔍 调试数据"):
+            st.write("原始数据样本:")
+            st.dataframe(analysis_data['data'].head(), use_container_width=True)
+            st.write(f"数据形状: {analysis_data['data'].shape}")
+            st.write(f"列名: {list(analysis_data['data'].columns)}")
+
+        render_link_charts(link_url, data)
+
+        # 显示数据表格
+        with st.expander(f"📋 {link_url} 详细数据"):
+            # 重命名列用于显示
+            display_data = data.rename(columns={
+                'daily_clicks': '每日点击量(PV)',
+                'daily_visitors': '每日访客数(UV)',
+                'daily_views': '每日浏览量',
+                'daily_pv_conversion_rate': 'PV转化率(%)',
+                'daily_uv_conversion_rate': 'UV转化率(%)'
+            })
+
+            st.dataframe(display_data, use_container_width=True)
+
+            # 下载按钮
+            st.download_button(
+                label=f"📥 下载 {link_url} 数据",
+                data=link_csv_bytes(display_data),
+                file_name=f"link_conversion_{link_file_slug(link_url)}_{today_str}.csv",
+                mime="text/csv"
+            )
 
-            # 转化率图表
-            if "PV转化率" in chart_options or "UV转化率" in chart_options:
-                st.markdown("#### 📊 转化率趋势")
+        st.markdown("---")  # 分隔线
 
-                # 准备转化率数据
-                conversion_data = data[['date', 'daily_pv_conversion_rate', 'daily_uv_conversion_rate']].copy()
-                conversion_data = conversion_data.melt(
-                    id_vars=['date'],
-                    value_vars=['daily_pv_conversion_rate', 'daily_uv_conversion_rate'],
-                    var_name='type',
-                    value_name='rate'
-                )
-                conversion_data['type'] = conversion_data['type'].map({
-                    'daily_pv_conversion_rate': 'PV转化率',
-                    'daily_uv_conversion_rate': 'UV转化率'
-                })
-
-                # 筛选选中的转化率类型
-                if "PV转化率" in chart_options and "UV转化率" in chart_options:
-                    filtered_conversion_data = conversion_data
-                elif "PV转化率" in chart_options:
-                    filtered_conversion_data = conversion_data[conversion_data['type'] == 'PV转化率']
-                else:
-                    filtered_conversion_data = conversion_data[conversion_data['type'] == 'UV转化率']
-
-                conversion_chart = alt.Chart(filtered_conversion_data).mark_line(
-                    point=True, strokeWidth=2
-                ).encode(
-                    x=alt.X('date:T', title='日期'),
-                    y=alt.Y('rate:Q', title='转化率 (%)',
-                           scale=alt.Scale(domain=[0, filtered_conversion_data['rate'].max() * 1.1])),
-                    color=alt.Color('type:N', title='转化率类型'),
-                    tooltip=[
-                        alt.Tooltip('date:T', title='日期', format='%Y-%m-%d'),
-                        alt.Tooltip('rate:Q', title='转化率', format='.2f'),
-                        alt.Tooltip('type:N', title='类型')
-                    ]
-                ).properties(
-                    title=f"📊 {link_url} - 转化率趋势",
-                    height=300
-                )
+    if processor.clicks_df is not None:
+        # 获取链接转化率分析数据
+        # 以数据形状和日期范围作为指纹，数据不变时直接复用缓存结果
+        data_key = (merged_df.shape, processor.date_min, processor.date_max, processor.clicks_df.shape)
+        link_conversion_data = load_link_conversion_analysis(processor, data_key, start_date_str, end_date_str)
 
-                st.altair_chart(conversion_chart, use_container_width=True)
+        if link_conversion_data:
+            st.markdown("### 🔗 链接映射关系")
+            st.markdown("""
+            - `https://insnap.ai/videos` → 目标分组：`yujie_main_avatar`
+            - `https://insnap.ai/zh/download` → 目标分组：`wan_produce101`
+            """)
 
-            # 显示数据表格
-            with st.expander(f"📋 {link_url} 详细数据"):
-                # 重命名列用于显示
-                display_data = data.copy()
-                display_data = display_data.rename(columns={
-                    'daily_clicks': '每日点击量(PV)',
-                    'daily_visitors': '每日访客数(UV)',
-                    'daily_views': '每日浏览量',
-                    'daily_pv_conversion_rate': 'PV转化率(%)',
-                    'daily_uv_conversion_rate': 'UV转化率(%)'
-                })
-
-                st.dataframe(display_data, use_container_width=True)
-
-                # 下载按钮
-                csv_data = display_data.to_csv(index=False)
-                st.download_button(
-                    label=f"📥 下载 {link_url} 数据",
-                    data=csv_data,
-                    file_name=f"link_conversion_{link_url.replace('https://', '').replace('/', '_')}_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
+            # 所有链接的 PV/UV 趋势合并为一个分面图表：一个 spec、一次序列化
+            chart_frames = [
+                prep_link_frames(analysis_data['data'])[0].assign(link_url=link_url)
+                for link_url, analysis_data in link_conversion_data.items()
+                if not analysis_data['data'].empty
+            ]
+            if chart_frames:
+                render_pv_uv_chart(pd.concat(chart_frames, ignore_index=True), list(link_conversion_data))
 
-            st.markdown("---")  # 分隔线
+            # 为每个链接创建分析图表
+            for link_url, analysis_data in link_conversion_data.items():
+                render_link_section(link_url, analysis_data)
         else:
-            st.warning(f"链接 {link_url} 暂无数据")
+            st.warning("暂无链接转化数据")
     else:
         st.warning("暂无点击数据或账号数据")
 
@@ -1460,22 +1587,21 @@ with tab6:
     # 数据统计信息
     if summary:
         st.markdown("#### 📊 数据统计")
-        summary_html = EnhancedVisualization().create_summary_cards(summary)
+        summary_html = viz.create_summary_cards(summary)
         st.markdown(summary_html, unsafe_allow_html=True)
 
     # 原始数据预览
-    if processor.merged_df is not None:
-        st.markdown("#### 📄 合并数据预览")
-        st.dataframe(processor.merged_df.head(100), use_container_width=True)
-
-        # 数据下载
-        csv = processor.merged_df.to_csv(index=False)
-        st.download_button(
-            label="📥 下载合并数据",
-            data=csv,
-            file_name=f"enhanced_tiktok_data_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
+    st.markdown("#### 📄 合并数据预览")
+    st.dataframe(merged_df.head(100), use_container_width=True)
+
+    # 数据下载
+    csv = merged_df.to_csv(index=False)
+    st.download_button(
+        label="📥 下载合并数据",
+        data=csv,
+        file_name=f"enhanced_tiktok_data_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv"
+    )
 
     # 点击数据预览
     if processor.clicks_df is not None:
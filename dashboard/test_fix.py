@@ -5,6 +5,8 @@ from datetime import datetime, timedelta, date
 import warnings
 import sys
 import os
+import io
+import shutil
 import requests
 
 # 设置页面配置
@@ -49,12 +51,39 @@ except Exception as e:
     st.error(f"❌ 模块导入失败: {e}")
     st.stop()
 
+def read_table_cached(path, reader):
+    """读取本地数据文件，并在 /tmp 缓存一份 Feather；源文件未修改时直接读取缓存"""
+    cache_path = os.path.join("/tmp", os.path.basename(path) + ".feather")
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return pd.read_feather(cache_path)
+    df = reader(path)
+    try:
+        df.to_feather(cache_path)
+    except Exception as e:
+        # 混合类型等无法写入 Feather 的列只影响缓存，不影响本次加载
+        st.write(f"[DEBUG] 缓存 {cache_path} 失败: {e}")
+    return df
+
+def download_to_buffer(url):
+    """流式下载远程文件到内存缓冲区，直接交给解析器，不再落地临时文件"""
+    with requests.get(url, stream=True) as r:
+        r.raise_for_status()  # 检查HTTP错误
+        r.raw.decode_content = True
+        buf = io.BytesIO()
+        shutil.copyfileobj(r.raw, buf)
+    buf.seek(0)
+    return buf
+
+def read_csv_fast(path):
+    """使用多线程的 pyarrow 引擎解析 CSV（路径或文件对象）"""
+    return pd.read_csv(path, engine="pyarrow")
+
 @st.cache_data
 def load_accounts_data():
     try:
         local_path = "data/postingManager_data/accounts_detail.xlsx"
         if os.path.exists(local_path):
-            df = pd.read_excel(local_path)
+            df = read_table_cached(local_path, pd.read_excel)
             st.write("[DEBUG] 本地 accounts_detail.xlsx 加载成功，shape:", df.shape)
             return df
         
@@ -65,13 +94,9 @@ def load_accounts_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/accounts_detail.xlsx"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 accounts_detail.xlsx 到 {tmp_path}")
-            df = pd.read_excel(tmp_path)
+            buf = download_to_buffer(url)
+            st.write(f"[DEBUG] 从 {url} 下载 accounts_detail.xlsx，大小: {buf.getbuffer().nbytes} 字节")
+            df = pd.read_excel(buf)
             st.write("[DEBUG] 云端 accounts_detail.xlsx 加载成功，shape:", df.shape)
             return df
         except Exception as e:
@@ -86,7 +111,7 @@ def load_redash_data():
     try:
         local_path = "data/redash_data/redash_data_2025-07-14.csv"
         if os.path.exists(local_path):
-            df = pd.read_csv(local_path)
+            df = read_table_cached(local_path, read_csv_fast)
             st.write("[DEBUG] 本地 redash_data_2025-07-14.csv 加载成功，shape:", df.shape)
             return df
         
@@ -97,13 +122,9 @@ def load_redash_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/redash_data.csv"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 redash_data.csv 到 {tmp_path}")
-            df = pd.read_csv(tmp_path)
+            buf = download_to_buffer(url)
+            st.write(f"[DEBUG] 从 {url} 下载 redash_data.csv，大小: {buf.getbuffer().nbytes} 字节")
+            df = read_csv_fast(buf)
             st.write("[DEBUG] 云端 redash_data.csv 加载成功，shape:", df.shape)
             return df
         except Exception as e:
@@ -118,7 +139,7 @@ def load_clicks_data():
     try:
         local_path = "data/clicks/your_clicks_file.csv"
         if os.path.exists(local_path):
-            df = pd.read_csv(local_path)
+            df = read_table_cached(local_path, read_csv_fast)
             st.write("[DEBUG] 本地 clicks 加载成功，shape:", df.shape)
             return df
         
@@ -129,13 +150,9 @@ def load_clicks_data():
             except Exception as secrets_error:
                 st.error(f"无法获取云端数据URL: {secrets_error}")
                 return None
-            response = requests.get(url)
-            response.raise_for_status()  # 检查HTTP错误
-            tmp_path = "/tmp/clicks.csv"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            st.write(f"[DEBUG] 从 {url} 下载 clicks.csv 到 {tmp_path}")
-            df = pd.read_csv(tmp_path)
+            buf = download_to_buffer(url)
+            st.write(f"[DEBUG] 从 {url} 下载 clicks.csv，大小: {buf.getbuffer().nbytes} 字节")
+            df = read_csv_fast(buf)
             st.write("[DEBUG] 云端 clicks.csv 加载成功，shape:", df.shape)
             return df
         except Exception as e:
@@ -145,6 +162,23 @@ def load_clicks_data():
         st.error(f"点击数据加载失败: {e}")
         return None
 
+def frame_key(df):
+    """DataFrame 的廉价指纹：形状 + 前 1000 行的哈希（None 返回 None）"""
+    if df is None:
+        return None
+    return (df.shape, int(pd.util.hash_pandas_object(df.head(1000)).sum()))
+
+@st.cache_resource
+def get_processor(accounts_key, redash_key, clicks_key, _accounts_df, _redash_df, _clicks_df):
+    """按输入数据指纹缓存已合并的数据处理器，重跑时不再重新构建和合并"""
+    processor = EnhancedTikTokDataProcessor(
+        accounts_df=_accounts_df,
+        redash_df=_redash_df,
+        clicks_df=_clicks_df
+    )
+    processor.merge_data()
+    return processor
+
 # 数据加载和错误处理
 st.header("📊 数据加载测试")
 
@@ -185,17 +219,16 @@ if accounts_df is None or redash_df is None or clicks_df is None:
 
 # 初始化数据处理器
 try:
-    processor = EnhancedTikTokDataProcessor(
-        accounts_df=accounts_df,
-        redash_df=redash_df,
-        clicks_df=clicks_df
+    processor = get_processor(
+        frame_key(accounts_df), frame_key(redash_df), frame_key(clicks_df),
+        accounts_df, redash_df, clicks_df
     )
     st.write("[DEBUG] EnhancedTikTokDataProcessor 初始化成功")
 except Exception as e:
     st.error(f"❌ 数据处理器初始化失败: {e}")
     st.stop()
 
-# 合并数据
+# 合并数据（get_processor 已合并过，输入未变化时 merge_data 直接返回）
 try:
     processor.merge_data()
     st.write(f"[DEBUG] merge_data() 完成，merged_df shape: {processor.merged_df.shape if processor.merged_df is not None else 'None'}")
@@ -4,13 +4,28 @@ import pandas as pd
 
 st.title("🔍 路径测试工具")
 
+@st.cache_data(ttl=300)
+def list_dir(path):
+    """列出目录内容；每次交互重跑脚本时直接用缓存，5 分钟后重新读取"""
+    return os.listdir(path)
+
+@st.cache_data(ttl=300)
+def read_excel_shape(path, mtime):
+    """读取 Excel 并返回形状；按路径和修改时间缓存，文件更新后自动重新读取"""
+    return pd.read_excel(path).shape
+
+@st.cache_data(ttl=300)
+def read_csv_shape(path, mtime):
+    """读取 CSV 并返回形状；按路径和修改时间缓存，文件更新后自动重新读取"""
+    return pd.read_csv(path).shape
+
 # 显示当前工作目录
 st.write(f"**当前工作目录:** {os.getcwd()}")
 
 # 显示当前目录内容
 st.write("**当前目录内容:**")
 try:
-    current_files = os.listdir(".")
+    current_files = list_dir(".")
     st.write(current_files)
 except Exception as e:
     st.write(f"读取当前目录失败: {e}")
@@ -20,7 +35,7 @@ st.write("**检查data目录:**")
 if os.path.exists("data"):
     st.success("✅ data目录存在")
     try:
-        data_files = os.listdir("data")
+        data_files = list_dir("data")
         st.write(f"data目录内容: {data_files}")
         
         # 检查子目录
@@ -29,7 +44,7 @@ if os.path.exists("data"):
             if os.path.exists(subdir_path):
                 st.success(f"✅ data/{subdir} 目录存在")
                 try:
-                    subdir_files = os.listdir(subdir_path)
+                    subdir_files = list_dir(subdir_path)
                     st.write(f"data/{subdir} 内容: {subdir_files}")
                 except Exception as e:
                     st.error(f"❌ 读取 data/{subdir} 失败: {e}")
@@ -55,8 +70,7 @@ for path in accounts_paths:
     if os.path.exists(path):
         st.success(f"✅ {path} 存在")
         try:
-            df = pd.read_excel(path)
-            st.write(f"   - 文件大小: {df.shape}")
+            st.write(f"   - 文件大小: {read_excel_shape(path, os.path.getmtime(path))}")
         except Exception as e:
             st.error(f"   - 读取失败: {e}")
     else:
@@ -74,8 +88,7 @@ for path in redash_paths:
     if os.path.exists(path):
         st.success(f"✅ {path} 存在")
         try:
-            df = pd.read_csv(path)
-            st.write(f"   - 文件大小: {df.shape}")
+            st.write(f"   - 文件大小: {read_csv_shape(path, os.path.getmtime(path))}")
         except Exception as e:
             st.error(f"   - 读取失败: {e}")
     else:
@@ -95,8 +108,7 @@ for path in clicks_paths:
     if os.path.exists(path):
         st.success(f"✅ {path} 存在")
         try:
-            df = pd.read_csv(path)
-            st.write(f"   - 文件大小: {df.shape}")
+            st.write(f"   - 文件大小: {read_csv_shape(path, os.path.getmtime(path))}")
         except Exception as e:
             st.error(f"   - 读取失败: {e}")
     else:
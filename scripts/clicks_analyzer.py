@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 from datetime import datetime, timedelta
 import warnings
 import sys
@@ -28,16 +29,109 @@ class ClicksAnalyzer:
         self.clicks_df = None
         self.merged_df = None
         self.processed_clicks = None
+        # 按 date 排序、并附带 page_type 映射结果（mapped_group 列）的 clicks 及其日期数组，用于按天切片
+        self.clicks_by_date = None
+        self.clicks_dates = None
+        self.clicks_by_date_source = None
+        # 按 page_type 缓存的 clicks/views 相关系数，processed_clicks 重新生成后失效
+        self.correlation_cache = {}
+        self.correlation_source = None
+        # group 名称 -> page_type 的映射结果，跨调用复用，每个名称只做一次关键词匹配
+        self.page_type_lookup = {}
         
-    def load_clicks_data(self):
-        """加载 clicks 数据"""
+    def read_csv_cached(self, csv_path, prepare, **read_kwargs):
+        """
+        读取 CSV 并在同目录缓存一份 Parquet，CSV 未修改时直接读取缓存
+        
+        热加载时跳过 CSV 解析和类型转换。Parquet 只能原样还原字符串类别和 ms/us/ns 精度的时间列，
+        所以写缓存前把类别统一成字符串类别（与默认引擎 dtype='category' 的结果一致）、
+        时间列统一成 ns 精度，冷加载和热加载得到的列类型相同。
+        缓存写入失败（例如目录只读）不影响本次加载。
+        
+        Args:
+            csv_path (str): CSV 文件路径
+            prepare (callable): 对读入的 DataFrame 做类型处理，返回处理后的 DataFrame
+            **read_kwargs: 传给 pd.read_csv 的参数（dtype、parse_dates 等）
+        
+        Returns:
+            pd.DataFrame: 处理后的数据
+        """
+        cache_path = csv_path + '.parquet'
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+            return pd.read_parquet(cache_path)
+        
+        # pyarrow 引擎多线程解析，列类型仍转换为普通的 pandas 类型
+        df = prepare(pd.read_csv(csv_path, engine='pyarrow', **read_kwargs))
+        for col in df.select_dtypes('category').columns:
+            categories = df[col].cat.categories
+            if not pd.api.types.is_string_dtype(categories):
+                # pyarrow 引擎读出的整数 ID 类别，Parquet 读回时会变成普通整数列
+                df[col] = df[col].cat.rename_categories(categories.astype(str))
+        for col in df.select_dtypes(['datetime', 'datetimetz']).columns:
+            # 秒精度的时间列写入 Parquet 后读回是 ms 精度
+            df[col] = df[col].dt.as_unit('ns')
+        try:
+            df.to_parquet(cache_path, compression='zstd')
+        except Exception as e:
+            print(f"⚠️ 写入缓存 {cache_path} 失败: {str(e)}")
+        return df
+    
+    def prepare_clicks(self, df):
+        """clicks 数据的类型处理：补全时间戳解析，并生成按天的 date 列"""
+        # 时间戳已由 read_csv 解析，格式不统一时才再解析一次
+        if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+        # 日期取当天零点，保持 datetime64 类型
+        df['date'] = df['timestamp'].dt.normalize()
+        if df['date'].dt.tz is not None:
+            df['date'] = df['date'].dt.tz_localize(None)
+        return df
+    
+    def iter_clicks_chunks(self, chunksize=500_000):
+        """
+        按块读取 clicks CSV，每块做与整表加载相同的类型处理
+        
+        Args:
+            chunksize (int): 每块行数
+        
+        Yields:
+            pd.DataFrame: 处理后的数据块（各块的类别列类别互不相同）
+        """
+        reader = pd.read_csv(
+            self.clicks_file_path,
+            chunksize=chunksize,
+            dtype={'visitor_id': 'category', 'session_id': 'category', 'page_type': 'category'},
+            parse_dates=['timestamp']
+        )
+        for chunk in reader:
+            yield self.prepare_clicks(chunk)
+    
+    def load_clicks_data(self, chunksize=None):
+        """
+        加载 clicks 数据
+        
+        Args:
+            chunksize (int): 指定时按块读取再拼接，用于内存放不下一次性解析的大文件（不写 Parquet 缓存）
+        """
         try:
             print("正在加载 clicks 数据...")
-            self.clicks_df = pd.read_csv(self.clicks_file_path)
             
-            # 处理时间戳
-            self.clicks_df['timestamp'] = pd.to_datetime(self.clicks_df['timestamp'])
-            self.clicks_df['date'] = pd.to_datetime(self.clicks_df['timestamp'].dt.date)
+            if chunksize:
+                chunks = list(self.iter_clicks_chunks(chunksize))
+                # 各块的类别不同，先统一成同一组类别，拼接后才能保持类别列
+                for col in ['visitor_id', 'session_id', 'page_type']:
+                    categories = union_categoricals([chunk[col] for chunk in chunks], sort_categories=True).categories
+                    for chunk in chunks:
+                        chunk[col] = chunk[col].cat.set_categories(categories)
+                self.clicks_df = pd.concat(chunks, ignore_index=True)
+            else:
+                # 解析时直接把 ID 和页面类型读成类别列、时间戳读成 datetime，避免再次转换
+                self.clicks_df = self.read_csv_cached(
+                    self.clicks_file_path,
+                    self.prepare_clicks,
+                    dtype={'visitor_id': 'category', 'session_id': 'category', 'page_type': 'category'},
+                    parse_dates=['timestamp']
+                )
             
             print(f"✅ Clicks 数据加载成功: {self.clicks_df.shape}")
             return True
@@ -46,14 +140,68 @@ class ClicksAnalyzer:
             print(f"❌ Clicks 数据加载失败: {str(e)}")
             return False
     
+    def ensure_clicks_data(self):
+        """clicks 数据尚未加载时按需加载，返回数据是否可用"""
+        return self.clicks_df is not None or self.load_clicks_data()
+    
+    def ensure_merged_data(self):
+        """合并数据尚未加载时按需加载，返回数据是否可用"""
+        return self.merged_df is not None or self.load_merged_data()
+    
+    def invalidate(self):
+        """丢弃已加载和处理的数据，下次使用时重新从文件加载（派生缓存按来源对象自动失效）"""
+        self.clicks_df = None
+        self.merged_df = None
+        self.processed_clicks = None
+    
+    def get_daily_clicks(self, date):
+        """
+        取某一天的 clicks 数据
+        
+        第一次调用时按 date 排序一次（同一份 clicks_df 只排序一次），之后用二分查找
+        定位当天的起止位置直接切片，不再对整列做布尔筛选。
+        排序时一并算好 page_type 映射出的 mapped_group 列，按天分析时不再逐次映射。
+        
+        Args:
+            date: 日期
+        
+        Returns:
+            pd.DataFrame: 当天的 clicks 数据
+        """
+        if self.clicks_by_date is None or self.clicks_by_date_source is not self.clicks_df:
+            clicks_by_date = self.clicks_df.sort_values('date', kind='stable')
+            self.clicks_by_date = clicks_by_date.assign(
+                mapped_group=self.map_page_types(clicks_by_date['page_type']).astype('category')
+            )
+            self.clicks_dates = self.clicks_by_date['date'].to_numpy()
+            self.clicks_by_date_source = self.clicks_df
+        
+        day = np.datetime64(pd.Timestamp(date).normalize())
+        start = self.clicks_dates.searchsorted(day, side='left')
+        end = self.clicks_dates.searchsorted(day, side='right')
+        return self.clicks_by_date.iloc[start:end]
+    
     def load_merged_data(self):
         """加载合并后的 TikTok 数据"""
         try:
             print("正在加载合并后的 TikTok 数据...")
-            self.merged_df = pd.read_csv(self.merged_data_path)
             
-            # 处理日期
-            self.merged_df['date'] = pd.to_datetime(self.merged_df['date'])
+            def prepare(df):
+                # 处理日期
+                df['date'] = pd.to_datetime(df['date'])
+                return df
+            
+            # 只读取分析用到的列（日期、账号、group、播放和互动增量），文件里没有的列跳过
+            needed_columns = ['date', 'user_id', 'group', 'view_diff', 'like_diff', 'comment_diff', 'share_diff']
+            header = pd.read_csv(self.merged_data_path, nrows=0).columns
+            
+            # group 和账号 ID 只用于分组和去重计数，直接读成类别列
+            self.merged_df = self.read_csv_cached(
+                self.merged_data_path,
+                prepare,
+                usecols=[col for col in header if col in needed_columns],
+                dtype={'group': 'category', 'user_id': 'category'}
+            )
             
             print(f"✅ 合并数据加载成功: {self.merged_df.shape}")
             return True
@@ -62,28 +210,54 @@ class ClicksAnalyzer:
             print(f"❌ 合并数据加载失败: {str(e)}")
             return False
     
+    def lookup_page_type(self, name):
+        """查询单个 group 名称对应的 page_type（结果缓存在 page_type_lookup 中）"""
+        if name not in self.page_type_lookup:
+            self.page_type_lookup[name] = get_page_type_for_group(name)
+        return self.page_type_lookup[name]
+    
+    def map_page_types(self, values):
+        """
+        把一列 group 名称整体映射为 page_type
+        
+        映射规则是关键词部分匹配，无法直接查字典；这里只对去重后的值调用
+        lookup_page_type，再用一次 Series.map 映射回整列。
+        类别列只映射各个类别，再按类别编码取值，不用扫描整列去重。
+        
+        Args:
+            values (pd.Series): group 名称列
+        
+        Returns:
+            pd.Series: 对应的 page_type 列（普通列，分组时按取值排序）
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # 末尾多放一个空值的映射结果，编码 -1（缺失）正好取到它，和 str(nan) 的映射一致
+            lookup = np.array(
+                [self.lookup_page_type(str(value)) for value in values.cat.categories]
+                + [self.lookup_page_type(str(np.nan))],
+                dtype=object
+            )
+            return pd.Series(lookup[values.cat.codes.to_numpy()], index=values.index, name=values.name)
+        
+        lookup = {value: self.lookup_page_type(str(value)) for value in values.unique()}
+        return values.map(lookup)
+    
     def process_clicks_by_group(self):
         """处理 clicks 数据，按 group 和 page_type 聚合"""
         try:
-            if self.clicks_df is None:
-                print("❌ 请先加载 clicks 数据")
+            if not self.ensure_clicks_data() or not self.ensure_merged_data():
                 return False
             
-            # 使用配置文件中的映射函数
-            def map_group_to_page_type(group):
-                return get_page_type_for_group(str(group))
-            
-            # 按 page_type 和日期聚合 clicks
-            clicks_agg = self.clicks_df.groupby(['page_type', 'date']).size().reset_index(name='click_count')
-            
-            # 按 group 和日期聚合 TikTok 数据
-            tiktok_agg = self.merged_df.groupby(['group', 'date'])['view_diff'].sum().reset_index()
+            # 按 page_type 和日期聚合 clicks（保留排好序的 (page_type, date) 索引，供后续按索引 join）
+            clicks_agg = self.clicks_df.groupby(['page_type', 'date'], observed=True).size().to_frame('click_count')
             
-            # 添加 page_type 映射
-            tiktok_agg['page_type'] = tiktok_agg['group'].apply(map_group_to_page_type)
-            
-            # 按 page_type 和日期聚合 TikTok 数据
-            tiktok_agg = tiktok_agg.groupby(['page_type', 'date'])['view_diff'].sum().reset_index()
+            # 先把 group 映射为 page_type，再按 page_type 和日期一次聚合 TikTok 数据
+            # （group 为空的行不参与映射，和按 group 分组时一样被丢弃）
+            groups = self.merged_df['group']
+            page_types = self.map_page_types(groups).where(groups.notna()).rename('page_type')
+            tiktok_agg = self.merged_df.groupby(
+                [page_types, 'date'], observed=True
+            )[['view_diff']].sum()
             
             self.processed_clicks = {
                 'clicks': clicks_agg,
@@ -107,66 +281,74 @@ class ClicksAnalyzer:
         Returns:
             pd.DataFrame: 对比数据
         """
-        if self.processed_clicks is None:
-            print("❌ 请先处理 clicks 数据")
+        if self.processed_clicks is None and not self.process_clicks_by_group():
             return None
         
-        clicks_df = self.processed_clicks['clicks'].copy()
-        tiktok_df = self.processed_clicks['tiktok'].copy()
+        clicks_df = self.processed_clicks['clicks']
+        tiktok_df = self.processed_clicks['tiktok']
         
         # 筛选 page_type
         if page_type:
-            clicks_df = clicks_df[clicks_df['page_type'] == page_type]
-            tiktok_df = tiktok_df[tiktok_df['page_type'] == page_type]
-        
-        # 合并数据
-        merged_data = pd.merge(
-            clicks_df, 
-            tiktok_df, 
-            on=['page_type', 'date'], 
-            how='outer',
-            suffixes=('_clicks', '_views')
-        )
+            clicks_df = clicks_df[clicks_df.index.get_level_values('page_type') == page_type]
+            tiktok_df = tiktok_df[tiktok_df.index.get_level_values('page_type') == page_type]
+        
+        # 两边都以排好序的 (page_type, date) 为索引，直接按索引合并
+        merged_data = clicks_df.join(tiktok_df, how='outer').reset_index()
         
         # 填充缺失值
         merged_data = merged_data.fillna(0)
         
         return merged_data
     
+    def correlate_clicks_views(self, data):
+        """计算一份 clicks vs views 数据的相关系数（少于 2 行时返回 None）"""
+        if len(data) < 2:
+            return None
+        return data['click_count'].corr(data['view_diff'])
+    
     def calculate_correlation(self, page_type=None):
         """
         计算 clicks 和 views 的相关性
         
+        第一次查询某个页面类型时，对全部页面类型的合并数据按 page_type 分组一次算完并缓存，
+        之后查询其他页面类型直接返回缓存结果。
+        
         Args:
             page_type (str): 页面类型
         
         Returns:
             float: 相关系数
         """
-        data = self.get_clicks_vs_views_data(page_type)
-        if data is None or len(data) < 2:
+        if self.processed_clicks is None and not self.process_clicks_by_group():
             return None
+        if self.correlation_source is not self.processed_clicks:
+            self.correlation_cache = {}
+            self.correlation_source = self.processed_clicks
+        if page_type in self.correlation_cache:
+            return self.correlation_cache[page_type]
         
-        # 计算相关系数
-        correlation = data['click_count'].corr(data['view_diff'])
+        if page_type:
+            data = self.get_clicks_vs_views_data()
+            for group_page_type, group_data in data.groupby('page_type', observed=True):
+                self.correlation_cache.setdefault(group_page_type, self.correlate_clicks_views(group_data))
+            # 没有数据的页面类型记为 None
+            return self.correlation_cache.setdefault(page_type, None)
+        
+        correlation = self.correlate_clicks_views(self.get_clicks_vs_views_data())
+        self.correlation_cache[page_type] = correlation
         return correlation
     
     def get_group_mapping_summary(self):
         """获取 group 映射摘要"""
-        if self.merged_df is None:
-            print("❌ 请先加载合并数据")
+        if not self.ensure_merged_data():
             return None
         
-        # 使用配置文件中的映射函数
-        def get_page_type(group):
-            return get_page_type_for_group(str(group))
-        
-        group_mapping = self.merged_df.groupby('group').agg({
+        group_mapping = self.merged_df.groupby('group', observed=True).agg({
             'user_id': 'nunique',
             'view_diff': 'sum'
         }).reset_index()
         
-        group_mapping['page_type'] = group_mapping['group'].apply(get_page_type)
+        group_mapping['page_type'] = self.map_page_types(group_mapping['group'])
         
         return group_mapping
     
@@ -217,17 +399,14 @@ class ClicksAnalyzer:
             dict: 关键指标字典
         """
         try:
-            if self.clicks_df is None:
-                print("❌ Clicks 数据尚未加载")
+            if not self.ensure_clicks_data():
                 return None
             
-            # 日期筛选
+            # 日期筛选（使用加载时预先计算的 date 列，按天切片）
             if date is None:
-                date = self.clicks_df['timestamp'].dt.date.max()
+                date = self.clicks_df['date'].max()
             
-            daily_clicks = self.clicks_df[
-                self.clicks_df['timestamp'].dt.date == date
-            ].copy()
+            daily_clicks = self.get_daily_clicks(date)
             
             if daily_clicks.empty:
                 print(f"❌ 指定日期 {date} 没有 clicks 数据")
@@ -261,25 +440,17 @@ class ClicksAnalyzer:
             pd.DataFrame: 关系分析数据
         """
         try:
-            if self.merged_df is None or self.clicks_df is None:
-                print("❌ 数据尚未加载")
+            if not self.ensure_clicks_data() or not self.ensure_merged_data():
                 return None
             
             # 处理 clicks 数据
-            clicks_daily = self.clicks_df.groupby(
-                self.clicks_df['timestamp'].dt.date
-            ).size().reset_index(name='click_count')
-            clicks_daily.columns = ['date', 'click_count']
+            clicks_daily = self.clicks_df.groupby('date').size().to_frame('click_count')
             
             # 处理互动数据
-            interaction_daily = self.merged_df.groupby('date')[interaction_metric].sum().reset_index()
+            interaction_daily = self.merged_df.groupby('date')[[interaction_metric]].sum()
             
-            # 合并数据
-            combined_data = clicks_daily.merge(
-                interaction_daily,
-                on='date',
-                how='inner'
-            )
+            # 两边都以排好序的 date 为索引，直接按索引合并
+            combined_data = clicks_daily.join(interaction_daily, how='inner').reset_index()
             
             if combined_data.empty:
                 print("❌ 没有匹配的数据")
@@ -306,8 +477,7 @@ class ClicksAnalyzer:
             pd.DataFrame: CVR 分析数据
         """
         try:
-            if self.merged_df is None or self.clicks_df is None:
-                print("❌ 数据尚未加载")
+            if not self.ensure_clicks_data() or not self.ensure_merged_data():
                 return None
             
             # 日期筛选
@@ -315,28 +485,22 @@ class ClicksAnalyzer:
                 date = self.merged_df['date'].max()
             
             # 获取指定日期的数据
-            daily_tiktok = self.merged_df[self.merged_df['date'] == date].copy()
-            daily_clicks = self.clicks_df[
-                self.clicks_df['timestamp'].dt.date == pd.Timestamp(date).date()
-            ].copy()
+            daily_tiktok = self.merged_df[self.merged_df['date'] == date]
+            daily_clicks = self.get_daily_clicks(date)
             
             if daily_tiktok.empty or daily_clicks.empty:
                 print(f"❌ 指定日期 {date} 数据不完整")
                 return None
             
             # 按 group 聚合 TikTok 数据
-            tiktok_by_group = daily_tiktok.groupby('group').agg({
+            tiktok_by_group = daily_tiktok.groupby('group', observed=True).agg({
                 'view_diff': 'sum',
                 'user_id': 'nunique'
             }).reset_index()
             tiktok_by_group.columns = ['group', 'view_diff', 'account_count']
             
-            # 按 group 聚合 clicks 数据（使用映射）
-            def get_group_from_page_type(page_type):
-                return get_page_type_for_group(page_type)
-            
-            daily_clicks['mapped_group'] = daily_clicks['page_type'].apply(get_group_from_page_type)
-            clicks_by_group = daily_clicks.groupby('mapped_group').size().reset_index(name='click_count')
+            # 按 group 聚合 clicks 数据（使用按天切片里预先映射好的 mapped_group 列）
+            clicks_by_group = daily_clicks.groupby('mapped_group', observed=True).size().reset_index(name='click_count')
             clicks_by_group.columns = ['group', 'click_count']
             
             # 合并数据
@@ -346,9 +510,13 @@ class ClicksAnalyzer:
                 how='left'
             ).fillna(0)
             
-            # 计算 CVR
-            cvr_data['cvr'] = (cvr_data['click_count'] / cvr_data['view_diff'].replace(0, 1)) * 100
-            cvr_data['cvr'] = cvr_data['cvr'].clip(0, 100)  # 限制在 0-100% 范围内
+            # 计算 CVR（views 为 0 时按 1 计算），直接在 NumPy 数组上原地运算
+            clicks = cvr_data['click_count'].to_numpy(dtype=np.float64)
+            views = cvr_data['view_diff'].to_numpy(dtype=np.float64)
+            cvr = np.divide(clicks, np.where(views == 0, 1.0, views))
+            np.multiply(cvr, 100, out=cvr)
+            np.clip(cvr, 0, 100, out=cvr)  # 限制在 0-100% 范围内
+            cvr_data['cvr'] = cvr
             
             # 排序
             cvr_data = cvr_data.sort_values('cvr', ascending=False)
@@ -371,30 +539,26 @@ class ClicksAnalyzer:
             pd.DataFrame: Top 页面数据
         """
         try:
-            if self.clicks_df is None:
-                print("❌ Clicks 数据尚未加载")
+            if not self.ensure_clicks_data():
                 return None
             
-            # 日期筛选
+            # 日期筛选（使用加载时预先计算的 date 列，按天切片）
             if date is None:
-                date = self.clicks_df['timestamp'].dt.date.max()
+                date = self.clicks_df['date'].max()
             
-            daily_clicks = self.clicks_df[
-                self.clicks_df['timestamp'].dt.date == date
-            ].copy()
+            daily_clicks = self.get_daily_clicks(date)
             
             if daily_clicks.empty:
                 print(f"❌ 指定日期 {date} 没有 clicks 数据")
                 return None
             
             # 按页面类型统计
-            page_stats = daily_clicks.groupby('page_type').agg({
-                'session_id': 'nunique',
-                'visitor_id': 'nunique',
-                'timestamp': 'count'
-            }).reset_index()
-            
-            page_stats.columns = ['page_type', 'unique_sessions', 'unique_visitors', 'total_clicks']
+            # 命名聚合一次算完；当天切片里的时间戳都非空，点击数直接用 size
+            page_stats = daily_clicks.groupby('page_type', observed=True).agg(
+                unique_sessions=('session_id', 'nunique'),
+                unique_visitors=('visitor_id', 'nunique'),
+                total_clicks=('session_id', 'size')
+            ).reset_index()
             
             # 计算平均点击次数
             page_stats['avg_clicks_per_session'] = page_stats['total_clicks'] / page_stats['unique_sessions']
@@ -421,15 +585,11 @@ class ClicksAnalyzer:
             pd.DataFrame: 趋势数据
         """
         try:
-            if self.clicks_df is None:
-                print("❌ Clicks 数据尚未加载")
+            if not self.ensure_clicks_data():
                 return None
             
             # 按日期和分组字段聚合
-            trends = self.clicks_df.groupby([
-                self.clicks_df['timestamp'].dt.date,
-                group_by
-            ]).size().reset_index(name=metric)
+            trends = self.clicks_df.groupby(['date', group_by], observed=True).size().reset_index(name=metric)
             
             trends.columns = ['date', group_by, metric]
             
@@ -439,27 +599,65 @@ class ClicksAnalyzer:
             print(f"❌ 获取点击趋势失败: {str(e)}")
             return None
 
-    def calculate_clicks_metrics_by_day(self):
+    def count_daily_clicks_in_chunks(self, chunksize):
+        """
+        按块流式统计每天的点击数、访客数和会话数，不加载完整的 clicks 表
+        
+        每块只保留按天的计数和去重后的 (date, ID) 对，最后再合并去重。
+        
+        Args:
+            chunksize (int): 每块行数
+        
+        Returns:
+            pd.DataFrame: 每天的 total_clicks / unique_visits / page_visits
+        """
+        totals = None
+        visitors = []
+        sessions = []
+        for chunk in self.iter_clicks_chunks(chunksize):
+            counts = chunk.groupby('date')['timestamp'].count()
+            totals = counts if totals is None else totals.add(counts, fill_value=0)
+            visitors.append(chunk[['date', 'visitor_id']].dropna().drop_duplicates())
+            sessions.append(chunk[['date', 'session_id']].dropna().drop_duplicates())
+        
+        # 各块的类别不同，拼接后为普通列，再跨块去重
+        unique_visits = pd.concat(visitors).drop_duplicates().groupby('date').size()
+        page_visits = pd.concat(sessions).drop_duplicates().groupby('date').size()
+        daily = pd.DataFrame({
+            'total_clicks': totals.astype('int64'),
+            'unique_visits': unique_visits,
+            'page_visits': page_visits,
+        }).fillna(0).astype('int64')
+        return daily.rename_axis('date').reset_index()
+    
+    def calculate_clicks_metrics_by_day(self, chunksize=None):
         """
         计算每天的 clicks 关键指标及昨日对比
+        Args:
+            chunksize (int): clicks 数据尚未加载时，按块流式统计而不加载完整表
         Returns:
             pd.DataFrame: 每天的关键指标及昨日对比
         """
-        if self.clicks_df is None:
-            print("❌ Clicks 数据尚未加载")
-            return None
-        df = self.clicks_df.copy()
-        df['date'] = pd.to_datetime(df['timestamp']).dt.date
-        daily = df.groupby('date').agg(
-            total_clicks=('timestamp', 'count'),
-            unique_visits=('visitor_id', 'nunique'),
-            page_visits=('session_id', 'nunique'),
-        ).reset_index()
+        if chunksize and self.clicks_df is None:
+            try:
+                daily = self.count_daily_clicks_in_chunks(chunksize)
+            except Exception as e:
+                print(f"❌ 按块统计 clicks 指标失败: {str(e)}")
+                return None
+        else:
+            if not self.ensure_clicks_data():
+                return None
+            daily = self.clicks_df.groupby('date').agg(
+                total_clicks=('timestamp', 'count'),
+                unique_visits=('visitor_id', 'nunique'),
+                page_visits=('session_id', 'nunique'),
+            ).reset_index()
         daily['avg_clicks_per_visit'] = daily['total_clicks'] / daily['unique_visits'].replace(0, 1)
-        # 昨日对比
+        # 昨日对比（昨日值只作中间结果，不保留为列；昨日为 0 时按 1 计算，第一天没有昨日为 NaN）
         for col in ['total_clicks', 'unique_visits', 'page_visits', 'avg_clicks_per_visit']:
-            daily[f'{col}_prev'] = daily[col].shift(1)
-            daily[f'{col}_pct'] = ((daily[col] - daily[f'{col}_prev']) / daily[f'{col}_prev'].replace(0, 1)) * 100
+            cur = daily[col].to_numpy(dtype=np.float64)
+            prev = daily[col].shift(1).to_numpy(dtype=np.float64)
+            daily[f'{col}_pct'] = (cur - prev) / np.where(prev == 0, 1.0, prev) * 100
         return daily
 
 def main():
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
+import os
+from concurrent.futures import ThreadPoolExecutor
 warnings.filterwarnings('ignore')
 
 class TikTokDataProcessor:
@@ -19,16 +21,37 @@ class TikTokDataProcessor:
         self.accounts_file_path = accounts_file_path
         self.merged_df = None
         self.group_mapping = None
+        # 按 date 排序后的 merged_df 及其日期数组，用于按天切片
+        self.merged_by_date = None
+        self.merged_dates = None
+        self.merged_by_date_source = None
+        # 按 (date, group) 预聚合的数值列合计及账号数，用于按天/按分组的汇总；
+        # 浮点列另存每格的非空个数，用于由合计推出均值
+        self.daily_group_totals = None
+        self.daily_group_counts = None
+        self.daily_group_totals_source = None
+        # merged_df 中所有 _diff 列，合并/读取数据时算一次
+        self.diff_columns = []
+        # user_id -> merged_df 行位置、KOL ID -> accounts_df 行位置，用于按账号查询
+        self.user_rows = None
+        self.user_rows_source = None
+        self.kol_rows = None
+        self.kol_rows_source = None
         
     def load_redash_data(self):
         """加载 redash 数据"""
         try:
             print("正在加载 redash 数据...")
-            redash_df = pd.read_csv(self.redash_file_path, low_memory=False)
+            # pyarrow 引擎多线程解析；混有非数字内容的列仍由下面的 to_numeric 统一转换
+            redash_df = pd.read_csv(self.redash_file_path, engine='pyarrow')
             print("Redash columns:", redash_df.columns)
             
             # 数据预处理
-            redash_df['date'] = pd.to_datetime(redash_df['YMDdate'], format='%d/%m/%y', errors='coerce')
+            # 同一天的日期字符串大量重复：先去重编码，只解析不同的字符串，再按编码展开
+            # （缺失值编码为 -1，取到末尾补的 NaT）
+            codes, uniques = pd.factorize(redash_df['YMDdate'])
+            parsed = pd.to_datetime(pd.Series(uniques), format='%d/%m/%y', errors='coerce').to_numpy()
+            redash_df['date'] = np.append(parsed, np.datetime64('NaT'))[codes]
             redash_df = redash_df.dropna(subset=['date'])
             
             # 确保 user_id 为字符串类型
@@ -45,6 +68,16 @@ class TikTokDataProcessor:
                 if col in redash_df.columns:
                     redash_df[col] = pd.to_numeric(redash_df[col], errors='coerce')
             
+            # 计数列（*_count / *_diff）取值在 int32 范围内时降为 int32，每帖比率列降为 float32，
+            # 减少后续分组聚合要扫过的内存
+            int32_info = np.iinfo(np.int32)
+            for col in redash_df.columns:
+                if col.endswith(('_count', '_diff')) and pd.api.types.is_integer_dtype(redash_df[col]):
+                    if redash_df[col].between(int32_info.min, int32_info.max).all():
+                        redash_df[col] = redash_df[col].astype('int32')
+                elif col.endswith('_per_post') and pd.api.types.is_float_dtype(redash_df[col]):
+                    redash_df[col] = redash_df[col].astype('float32')
+            
             print(f"✅ Redash 数据加载成功: {redash_df.shape}")
             return redash_df
             
@@ -56,7 +89,17 @@ class TikTokDataProcessor:
         """加载 accounts detail 数据"""
         try:
             print("正在加载 accounts detail 数据...")
-            accounts_df = pd.read_excel(self.accounts_file_path)
+            # 同目录缓存一份 Parquet，Excel 未修改时直接读取缓存，跳过 openpyxl 解析
+            cache_path = self.accounts_file_path + '.parquet'
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(self.accounts_file_path):
+                accounts_df = pd.read_parquet(cache_path)
+            else:
+                accounts_df = pd.read_excel(self.accounts_file_path)
+                try:
+                    accounts_df.to_parquet(cache_path, compression='zstd')
+                except Exception as e:
+                    # 混合类型的列或只读目录只影响缓存，不影响本次加载
+                    print(f"⚠️ 写入缓存 {cache_path} 失败: {str(e)}")
             self.accounts_df = accounts_df  # 修复：保存为实例属性
             
             # 创建 group 映射
@@ -79,19 +122,30 @@ class TikTokDataProcessor:
         try:
             print("正在合并数据...")
             
-            # 加载数据
-            redash_df = self.load_redash_data()
-            group_mapping = self.load_accounts_data()
+            # 加载数据：CSV 和 Excel 互不依赖，放到两个线程里同时解析
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                redash_future = executor.submit(self.load_redash_data)
+                accounts_future = executor.submit(self.load_accounts_data)
+                redash_df = redash_future.result()
+                group_mapping = accounts_future.result()
             
             if redash_df is None or group_mapping is None:
                 return False
             
+            # user_id 两边转成同一组（排好序的）类别，合并时按整数编码匹配
+            user_ids = pd.CategoricalDtype(
+                pd.Index(redash_df['user_id'].unique()).union(pd.Index(group_mapping['user_id'].unique()))
+            )
+            redash_df['user_id'] = redash_df['user_id'].astype(user_ids)
+            group_mapping['user_id'] = group_mapping['user_id'].astype(user_ids)
+            
             # 合并数据
             merged_df = redash_df.merge(group_mapping, on='user_id', how='left')
-            merged_df['group'] = merged_df['group'].fillna('Unknown')
+            merged_df['group'] = merged_df['group'].fillna('Unknown').astype('category')
             
             self.merged_df = merged_df
             self.group_mapping = group_mapping
+            self.diff_columns = [col for col in merged_df.columns if col.endswith('_diff')]
             
             print(f"✅ 数据合并成功: {merged_df.shape}")
             return True
@@ -100,23 +154,124 @@ class TikTokDataProcessor:
             print(f"❌ 数据合并失败: {str(e)}")
             return False
     
+    def get_daily_data(self, date):
+        """
+        取某一天的合并数据
+        
+        第一次调用时按 date 稳定排序一次（同一份 merged_df 只排序一次，当天内的行序不变），
+        之后用二分查找定位当天的起止位置直接切片，不再对整列做布尔筛选。
+        
+        Args:
+            date: 日期
+        
+        Returns:
+            pd.DataFrame: 当天的数据（只读切片，需要修改时先 copy）
+        """
+        if self.merged_by_date is None or self.merged_by_date_source is not self.merged_df:
+            self.merged_by_date = self.merged_df.sort_values('date', kind='stable')
+            self.merged_dates = self.merged_by_date['date'].to_numpy()
+            self.merged_by_date_source = self.merged_df
+        
+        day = np.datetime64(pd.Timestamp(date))
+        start = self.merged_dates.searchsorted(day, side='left')
+        end = self.merged_dates.searchsorted(day, side='right')
+        return self.merged_by_date.iloc[start:end]
+    
+    def count_unique_accounts(self, df, keys):
+        """
+        按 keys 分组统计不同 user_id 的个数，结果与 groupby(keys)['user_id'].nunique() 相同
+        
+        先对 (keys, user_id) 整体去重一次，再按 keys 计行数，不用逐组去重。
+        user_id 有空值时（全空的分组要计 0）退回 nunique。
+        
+        Args:
+            df (pd.DataFrame): 数据
+            keys (list): 分组列
+        
+        Returns:
+            pd.Series: 各分组的账号数
+        """
+        if df['user_id'].hasnans:
+            return df.groupby(keys, observed=True)['user_id'].nunique()
+        pairs = df[keys + ['user_id']].drop_duplicates()
+        return pairs.groupby(keys, observed=True).size().rename('user_id')
+    
+    def get_top_rows(self, df, metric, top_n):
+        """
+        取 metric 最大的前 top_n 行，结果与 df.nlargest(top_n, metric) 相同（并列时靠前的行优先）
+        
+        先用 np.partition 找出第 top_n 大的值，只对不小于它的少量候选行做稳定排序，
+        不再对整天的数据排序。
+        
+        Args:
+            df (pd.DataFrame): 数据
+            metric (str): 排序指标
+            top_n (int): 返回前 N 行
+        
+        Returns:
+            pd.DataFrame: 前 N 行
+        """
+        values = df[metric].to_numpy(dtype='float64', na_value=np.nan)
+        positions = np.flatnonzero(~np.isnan(values))
+        values = values[positions]
+        if top_n <= 0:
+            return df.iloc[:0]
+        if len(values) <= top_n:
+            # 与 nlargest 一致：非空值不足 top_n 时全部降序返回，再用空值行补足
+            order = np.argsort(-values, kind='stable')
+            rest = np.setdiff1d(np.arange(len(df)), positions, assume_unique=True)
+            return df.iloc[np.concatenate([positions[order], rest])[:top_n]]
+        kth = len(values) - top_n
+        threshold = np.partition(values, kth)[kth]
+        candidates = values >= threshold
+        positions, values = positions[candidates], values[candidates]
+        order = np.argsort(-values, kind='stable')[:top_n]
+        return df.iloc[positions[order]]
+    
+    def get_daily_group_totals(self):
+        """
+        按 (date, group) 预聚合的数值列合计，以及每格的账号数（account_count）
+        
+        同一份 merged_df 只聚合一次；按天或按分组的合计都从这张小表再汇总，
+        不再每次对全量数据 groupby。
+        
+        Returns:
+            pd.DataFrame: 以 (date, group) 为索引的合计表
+        """
+        if self.daily_group_totals is None or self.daily_group_totals_source is not self.merged_df:
+            # 整数列的合计本身就是 int64；float32 列先转为 float64 再求和，合计保持 float64 精度
+            values = self.merged_df.select_dtypes('number')
+            values = values.astype({col: 'float64' for col in values.select_dtypes('float32').columns})
+            grouped = values.groupby([self.merged_df['date'], self.merged_df['group']], observed=True)
+            totals = grouped.sum()
+            totals['account_count'] = self.count_unique_accounts(self.merged_df, ['date', 'group'])
+            self.daily_group_totals = totals
+            self.daily_group_counts = grouped[values.select_dtypes('floating').columns].count()
+            self.daily_group_totals_source = self.merged_df
+        return self.daily_group_totals
+    
     def get_data_summary(self):
         """获取数据摘要"""
         if self.merged_df is None:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
+        # 只比较一次 group 列，匹配/未匹配条数都由同一个布尔数组求和得到
+        total_records = len(self.merged_df)
+        unmatched_records = int((self.merged_df['group'] == 'Unknown').to_numpy().sum())
+        matched_records = total_records - unmatched_records
+        
         summary = {
-            'total_records': len(self.merged_df),
+            'total_records': total_records,
             'unique_accounts': self.merged_df['user_id'].nunique(),
             'unique_groups': self.merged_df['group'].nunique(),
             'date_range': {
                 'start': self.merged_df['date'].min(),
                 'end': self.merged_df['date'].max()
             },
-            'matched_records': len(self.merged_df[self.merged_df['group'] != 'Unknown']),
-            'unmatched_records': len(self.merged_df[self.merged_df['group'] == 'Unknown']),
-            'match_rate': len(self.merged_df[self.merged_df['group'] != 'Unknown']) / len(self.merged_df) * 100
+            'matched_records': matched_records,
+            'unmatched_records': unmatched_records,
+            'match_rate': matched_records / total_records * 100
         }
         
         return summary
@@ -127,7 +282,7 @@ class TikTokDataProcessor:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
-        group_stats = self.merged_df.groupby('group')['user_id'].nunique().sort_values(ascending=False)
+        group_stats = self.count_unique_accounts(self.merged_df, ['group']).sort_values(ascending=False)
         return group_stats
     
     def filter_data(self, start_date=None, end_date=None, groups=None):
@@ -146,22 +301,21 @@ class TikTokDataProcessor:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
-        filtered_df = self.merged_df.copy()
+        # 各条件合成一个掩码，只筛选一次
+        mask = pd.Series(True, index=self.merged_df.index)
         
         # 日期筛选
         if start_date:
-            start_date = pd.Timestamp(start_date)
-            filtered_df = filtered_df[filtered_df['date'] >= start_date]
+            mask &= self.merged_df['date'] >= pd.Timestamp(start_date)
         
         if end_date:
-            end_date = pd.Timestamp(end_date)
-            filtered_df = filtered_df[filtered_df['date'] <= end_date]
+            mask &= self.merged_df['date'] <= pd.Timestamp(end_date)
         
         # 分组筛选
         if groups:
-            filtered_df = filtered_df[filtered_df['group'].isin(groups)]
+            mask &= self.merged_df['group'].isin(groups)
         
-        return filtered_df
+        return self.merged_df[mask]
     
     def get_daily_aggregates(self, metrics=None):
         """
@@ -180,7 +334,12 @@ class TikTokDataProcessor:
         if metrics is None:
             metrics = ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']
         
-        daily_data = self.merged_df.groupby('date')[metrics].sum().reset_index()
+        totals = self.get_daily_group_totals()
+        if all(metric in totals.columns for metric in metrics):
+            daily_data = totals.groupby(level='date')[metrics].sum().reset_index()
+        else:
+            # 非数值列不在预聚合表里，按原始数据聚合
+            daily_data = self.merged_df.groupby('date')[metrics].sum().reset_index()
         return daily_data
     
     def get_efficiency_metrics(self, metric='view_per_post'):
@@ -201,7 +360,15 @@ class TikTokDataProcessor:
             print(f"❌ 指标 {metric} 不存在")
             return None
         
-        efficiency_data = self.merged_df.groupby('date')[metric].mean().reset_index()
+        totals = self.get_daily_group_totals()
+        if metric in self.daily_group_counts.columns:
+            # 每日均值 = (date, group) 合计表按天汇总的合计 / 非空个数，不再扫描全量数据
+            sums = totals[metric].groupby(level='date').sum()
+            counts = self.daily_group_counts[metric].groupby(level='date').sum()
+            efficiency_data = (sums / counts).rename(metric).reset_index()
+        else:
+            # 整数列没有单独的计数，按原始数据求均值
+            efficiency_data = self.merged_df.groupby('date')[metric].mean().reset_index()
         return efficiency_data
     
     def get_group_performance(self, date=None):
@@ -221,23 +388,32 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        latest_data = self.merged_df[self.merged_df['date'] == date].copy()
-        
-        if latest_data.empty:
-            print(f"❌ 指定日期 {date} 没有数据")
-            return None
-        
-        group_stats = latest_data.groupby('group').agg({
-            'view_count': 'sum',
-            'post_count': 'sum',
-            'like_count': 'sum',
-            'comment_count': 'sum',
-            'share_count': 'sum',
-            'view_per_post': 'mean',
-            'like_per_post': 'mean',
-            'comment_per_post': 'mean',
-            'share_per_post': 'mean'
-        }).round(2)
+        sum_columns = ['view_count', 'post_count', 'like_count', 'comment_count', 'share_count']
+        mean_columns = ['view_per_post', 'like_per_post', 'comment_per_post', 'share_per_post']
+        
+        totals = self.get_daily_group_totals()
+        if all(col in totals.columns for col in sum_columns) and \
+                all(col in self.daily_group_counts.columns for col in mean_columns):
+            # 直接取 (date, group) 合计表中这一天的行：合计列原样使用，均值 = 合计 / 非空个数（float64）
+            try:
+                day_totals = totals.xs(pd.Timestamp(date), level='date')
+            except KeyError:
+                print(f"❌ 指定日期 {date} 没有数据")
+                return None
+            day_counts = self.daily_group_counts.xs(pd.Timestamp(date), level='date')
+            group_stats = day_totals[sum_columns].join(
+                day_totals[mean_columns] / day_counts[mean_columns]
+            ).round(2)
+        else:
+            latest_data = self.get_daily_data(date)
+            
+            if latest_data.empty:
+                print(f"❌ 指定日期 {date} 没有数据")
+                return None
+            
+            group_stats = latest_data.groupby('group', observed=True).agg(
+                {**{col: 'sum' for col in sum_columns}, **{col: 'mean' for col in mean_columns}}
+            ).round(2)
         
         group_stats = group_stats.reset_index()
         group_stats = group_stats.sort_values('view_count', ascending=False)
@@ -249,20 +425,68 @@ class TikTokDataProcessor:
         保存合并后的数据
         
         Args:
-            output_path (str): 输出文件路径
+            output_path (str): 输出文件路径，以 .parquet 结尾时保存为 Parquet（保留列类型，
+                可用 load_merged_data 快速读回），否则保存为 CSV
         """
         if self.merged_df is None:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return False
         
         try:
-            self.merged_df.to_csv(output_path, index=False)
+            if output_path.endswith('.parquet'):
+                self.merged_df.to_parquet(output_path, index=False, compression='zstd')
+            else:
+                self.write_csv(output_path)
             print(f"✅ 数据已保存到: {output_path}")
             return True
         except Exception as e:
             print(f"❌ 数据保存失败: {str(e)}")
             return False
     
+    def write_csv(self, output_path):
+        """
+        用 pyarrow 的多线程 CSV 写出器保存 merged_df，没有 pyarrow 时退回 to_csv
+        
+        只含日期（时间均为 0 点）的时间列按日期写出，与 to_csv 一致；字符串值会加引号，
+        用 read_csv 读回的结果与 to_csv 的输出相同。
+        
+        Args:
+            output_path (str): 输出文件路径
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pacsv
+        except ImportError:
+            self.merged_df.to_csv(output_path, index=False)
+            return
+        
+        table = pa.Table.from_pandas(self.merged_df, preserve_index=False)
+        for col in self.merged_df.select_dtypes('datetime').columns:
+            values = self.merged_df[col]
+            if values.dt.normalize().equals(values):
+                i = table.schema.get_field_index(col)
+                table = table.set_column(i, col, table.column(i).cast(pa.date32()))
+        pacsv.write_csv(table, output_path)
+    
+    def load_merged_data(self, input_path):
+        """
+        读取 save_merged_data 保存的 Parquet 合并数据，跳过 redash/accounts 的加载与合并
+        
+        Args:
+            input_path (str): Parquet 文件路径
+        
+        Returns:
+            bool: 是否读取成功
+        """
+        try:
+            self.merged_df = pd.read_parquet(input_path, memory_map=True)
+            self.diff_columns = [col for col in self.merged_df.columns if col.endswith('_diff')]
+            print(f"✅ 合并数据读取成功: {self.merged_df.shape}")
+            return True
+        except Exception as e:
+            print(f"❌ 合并数据读取失败: {str(e)}")
+            return False
+    
     def get_daily_diff_metrics(self, metric='view_diff', groups=None):
         """
         获取每日新增量指标数据
@@ -282,14 +506,19 @@ class TikTokDataProcessor:
             print(f"❌ 指标 {metric} 不存在")
             return None
         
-        # 筛选数据
-        filtered_df = self.merged_df.copy()
-        if groups:
-            filtered_df = filtered_df[filtered_df['group'].isin(groups)]
+        totals = self.get_daily_group_totals()
+        if metric not in totals.columns:
+            # 非数值列不在预聚合表里，按原始数据聚合
+            filtered_df = self.merged_df
+            if groups:
+                filtered_df = filtered_df[filtered_df['group'].isin(groups)]
+            return filtered_df.groupby(['date', 'group'], observed=True)[metric].sum().reset_index()
         
-        # 按日期和分组聚合
-        daily_diff = filtered_df.groupby(['date', 'group'])[metric].sum().reset_index()
-        return daily_diff
+        # 直接从 (date, group) 合计表中取出该指标并筛选分组
+        daily_diff = totals[metric]
+        if groups:
+            daily_diff = daily_diff[daily_diff.index.get_level_values('group').isin(groups)]
+        return daily_diff.reset_index()
     
     def get_top_accounts(self, date=None, top_n=5, metric='view_diff'):
         """
@@ -311,16 +540,16 @@ class TikTokDataProcessor:
             date = self.merged_df['date'].max()
         
         # 筛选指定日期的数据
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
+        daily_data = self.get_daily_data(date)
         
         if daily_data.empty:
             print(f"❌ 指定日期 {date} 没有数据")
             return None
         
         # 按指标排序并获取前 N 名
-        top_accounts = daily_data.nlargest(top_n, metric)[
+        top_accounts = self.get_top_rows(daily_data, metric, top_n)[
             ['user_id', 'group', 'view_diff', 'like_diff', 'comment_diff', 'share_diff']
-        ].copy()
+        ]
         
         return top_accounts
     
@@ -340,8 +569,11 @@ class TikTokDataProcessor:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
-        # 筛选账号数据
-        account_data = self.merged_df[self.merged_df['user_id'] == user_id].copy()
+        # 筛选账号数据（同一份 merged_df 只建一次 user_id -> 行位置 的索引）
+        if self.user_rows is None or self.user_rows_source is not self.merged_df:
+            self.user_rows = self.merged_df.groupby('user_id', observed=True, sort=False).indices
+            self.user_rows_source = self.merged_df
+        account_data = self.merged_df.iloc[self.user_rows.get(user_id, np.empty(0, dtype=np.intp))]
         
         if account_data.empty:
             print(f"❌ 账号 {user_id} 不存在")
@@ -375,17 +607,23 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
-        
-        if daily_data.empty:
-            print(f"❌ 指定日期 {date} 没有数据")
-            return None
-        
-        # 获取所有 _diff 列
-        diff_columns = [col for col in daily_data.columns if col.endswith('_diff')]
-        
-        # 按 group 聚合
-        group_summary = daily_data.groupby('group')[diff_columns].sum().reset_index()
+        totals = self.get_daily_group_totals()
+        if all(col in totals.columns for col in self.diff_columns):
+            # 当天各分组的 _diff 合计直接取 (date, group) 合计表中这一天的行
+            try:
+                group_summary = totals.xs(pd.Timestamp(date), level='date')[self.diff_columns].reset_index()
+            except KeyError:
+                print(f"❌ 指定日期 {date} 没有数据")
+                return None
+        else:
+            daily_data = self.get_daily_data(date)
+            
+            if daily_data.empty:
+                print(f"❌ 指定日期 {date} 没有数据")
+                return None
+            
+            # 按 group 聚合
+            group_summary = daily_data.groupby('group', observed=True)[self.diff_columns].sum().reset_index()
         
         return group_summary
     
@@ -408,7 +646,7 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
+        daily_data = self.get_daily_data(date)
         
         if daily_data.empty:
             print(f"❌ 指定日期 {date} 没有数据")
@@ -419,9 +657,9 @@ class TikTokDataProcessor:
             return None
         
         # 按指标排序并获取前 N 名
-        ranking = daily_data.nlargest(top_n, metric)[
+        ranking = self.get_top_rows(daily_data, metric, top_n)[
             ['user_id', 'group', 'view_diff', 'like_diff', 'comment_diff', 'share_diff']
-        ].copy()
+        ]
         
         return ranking
     
@@ -441,34 +679,21 @@ class TikTokDataProcessor:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
-        # 筛选分组数据
-        group_data = self.merged_df[self.merged_df['group'] == group_name].copy()
-        
-        if group_data.empty:
+        # 筛选分组数据（(date, group) 合计表里该分组的每一行就是它每天的合计和账号数）
+        try:
+            group_data = self.get_daily_group_totals().xs(group_name, level='group')
+        except KeyError:
             print(f"❌ 分组 {group_name} 不存在")
             return None
         
-        # 日期筛选
-        if start_date:
-            start_date = pd.Timestamp(start_date)
-            group_data = group_data[group_data['date'] >= start_date]
-        
-        if end_date:
-            end_date = pd.Timestamp(end_date)
-            group_data = group_data[group_data['date'] <= end_date]
-        
-        # 按日期聚合
-        trend_data = group_data.groupby('date').agg({
-            'view_diff': 'sum',
-            'like_diff': 'sum',
-            'comment_diff': 'sum',
-            'share_diff': 'sum',
-            'user_id': 'nunique'
-        }).reset_index()
-        
-        trend_data = trend_data.rename(columns={'user_id': 'account_count'})
+        # 日期筛选（合计表已按日期排好序，直接按日期区间切片）
+        start = pd.Timestamp(start_date) if start_date else None
+        end = pd.Timestamp(end_date) if end_date else None
+        trend_data = group_data.loc[
+            start:end, ['view_diff', 'like_diff', 'comment_diff', 'share_diff', 'account_count']
+        ].reset_index()
         
-        return trend_data.sort_values('date')
+        return trend_data
     
     def get_account_details(self, user_ids=None):
         """
@@ -486,12 +711,16 @@ class TikTokDataProcessor:
                 return None
             
             if user_ids is not None:
-                # 根据 user_id 筛选账号
-                account_details = self.accounts_df[
-                    self.accounts_df['KOL ID'].astype(str).isin([str(uid) for uid in user_ids])
-                ].copy()
+                # 根据 user_id 筛选账号（KOL ID 只转一次字符串并建索引，按原表行序取出）
+                if self.kol_rows is None or self.kol_rows_source is not self.accounts_df:
+                    kol_ids = self.accounts_df['KOL ID'].astype(str)
+                    self.kol_rows = self.accounts_df.groupby(kol_ids, sort=False, dropna=False).indices
+                    self.kol_rows_source = self.accounts_df
+                rows = [self.kol_rows[uid] for uid in {str(uid) for uid in user_ids} if uid in self.kol_rows]
+                positions = np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.intp)
+                account_details = self.accounts_df.iloc[positions]
             else:
-                account_details = self.accounts_df.copy()
+                account_details = self.accounts_df
             
             # 选择关键字段
             key_columns = [
@@ -502,7 +731,7 @@ class TikTokDataProcessor:
             
             # 确保所有列都存在
             available_columns = [col for col in key_columns if col in account_details.columns]
-            account_details = account_details[available_columns].copy()
+            account_details = account_details[available_columns]
             
             # 清理数据
             account_details = account_details.dropna(subset=['KOL ID'])
@@ -530,26 +759,31 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
+        daily_data = self.get_daily_data(date)
         
         if daily_data.empty:
             print(f"❌ 指定日期 {date} 没有数据")
             return None
         
+        # 每个指标列只求和一次（逐列求和以保留各列原有的整数/浮点类型），平均值由合计推出
+        diff_columns = ['post_diff', 'view_diff', 'like_diff', 'comment_diff', 'share_diff']
+        totals = {col: daily_data[col].sum() for col in diff_columns}
+        posts = max(totals['post_diff'], 1)
+        
         # 计算汇总指标
         summary = {
             'date': date,
-            'total_posts': daily_data['post_diff'].sum(),
-            'total_views': daily_data['view_diff'].sum(),
-            'total_likes': daily_data['like_diff'].sum(),
-            'total_comments': daily_data['comment_diff'].sum(),
-            'total_shares': daily_data['share_diff'].sum(),
+            'total_posts': totals['post_diff'],
+            'total_views': totals['view_diff'],
+            'total_likes': totals['like_diff'],
+            'total_comments': totals['comment_diff'],
+            'total_shares': totals['share_diff'],
             'total_followers': daily_data.get('follower_diff', pd.Series([0])).sum(),
-            'active_accounts': len(daily_data['user_id'].unique()),
-            'avg_view_per_post': daily_data['view_diff'].sum() / max(daily_data['post_diff'].sum(), 1),
-            'avg_like_per_post': daily_data['like_diff'].sum() / max(daily_data['post_diff'].sum(), 1),
-            'avg_comment_per_post': daily_data['comment_diff'].sum() / max(daily_data['post_diff'].sum(), 1),
-            'avg_share_per_post': daily_data['share_diff'].sum() / max(daily_data['post_diff'].sum(), 1)
+            'active_accounts': daily_data['user_id'].nunique(dropna=False),
+            'avg_view_per_post': totals['view_diff'] / posts,
+            'avg_like_per_post': totals['like_diff'] / posts,
+            'avg_comment_per_post': totals['comment_diff'] / posts,
+            'avg_share_per_post': totals['share_diff'] / posts
         }
         
         return summary
@@ -572,30 +806,37 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
+        daily_data = self.get_daily_data(date)
         
         if daily_data.empty:
             print(f"❌ 指定日期 {date} 没有数据")
             return None
         
         # 计算效率指标
-        if metric == 'view_per_post':
-            daily_data['efficiency'] = daily_data['view_diff'] / daily_data['post_diff'].replace(0, 1)
-        elif metric == 'like_per_post':
-            daily_data['efficiency'] = daily_data['like_diff'] / daily_data['post_diff'].replace(0, 1)
-        elif metric == 'comment_per_post':
-            daily_data['efficiency'] = daily_data['comment_diff'] / daily_data['post_diff'].replace(0, 1)
-        elif metric == 'share_per_post':
-            daily_data['efficiency'] = daily_data['share_diff'] / daily_data['post_diff'].replace(0, 1)
-        else:
+        metric_columns = {
+            'view_per_post': 'view_diff',
+            'like_per_post': 'like_diff',
+            'comment_per_post': 'comment_diff',
+            'share_per_post': 'share_diff'
+        }
+        if metric not in metric_columns:
             print(f"❌ 不支持的效率指标: {metric}")
             return None
         
+        # 直接在数组上计算（发帖数为 0 按 1 计），不再 replace 后拷贝整张表
+        posts = daily_data['post_diff'].to_numpy()
+        efficiency = pd.Series(
+            daily_data[metric_columns[metric]].to_numpy() / np.where(posts == 0, 1, posts),
+            index=daily_data.index,
+            name='efficiency'
+        )
+        
         # 按分组聚合效率分布
-        efficiency_dist = daily_data.groupby('group').agg({
-            'efficiency': ['mean', 'median', 'std', 'count'],
-            'user_id': 'nunique'
-        }).reset_index()
+        efficiency_dist = efficiency.groupby(daily_data['group'], observed=True).agg(
+            ['mean', 'median', 'std', 'count']
+        )
+        efficiency_dist['account_count'] = self.count_unique_accounts(daily_data, ['group'])
+        efficiency_dist = efficiency_dist.reset_index()
         
         # 扁平化列名
         efficiency_dist.columns = [
@@ -620,30 +861,34 @@ class TikTokDataProcessor:
             print("❌ 数据尚未加载，请先调用 merge_data()")
             return None
         
-        # 日期筛选
-        filtered_data = self.merged_df.copy()
+        # 日期筛选（在 (date, group) 合计表上进行）
+        totals = self.get_daily_group_totals()
+        dates = totals.index.get_level_values('date')
+        mask = np.ones(len(totals), dtype=bool)
         
         if start_date:
-            start_date = pd.Timestamp(start_date)
-            filtered_data = filtered_data[filtered_data['date'] >= start_date]
+            mask &= dates >= pd.Timestamp(start_date)
         
         if end_date:
-            end_date = pd.Timestamp(end_date)
-            filtered_data = filtered_data[filtered_data['date'] <= end_date]
+            mask &= dates <= pd.Timestamp(end_date)
         
         # 按日期聚合互动指标
-        interaction_data = filtered_data.groupby('date').agg({
-            'like_diff': 'sum',
-            'comment_diff': 'sum',
-            'share_diff': 'sum',
-            'view_diff': 'sum'
-        }).reset_index()
+        interaction_data = totals.loc[
+            mask, ['like_diff', 'comment_diff', 'share_diff', 'view_diff']
+        ].groupby(level='date').sum().reset_index()
         
         # 计算增长率
         interaction_data = interaction_data.sort_values('date')
         
-        for col in ['like_diff', 'comment_diff', 'share_diff', 'view_diff']:
-            interaction_data[f'{col}_growth'] = interaction_data[col].pct_change() * 100
+        # 四列的环比增长率在同一个二维数组上一次算出（与 pct_change() * 100 相同）
+        growth_columns = ['like_diff', 'comment_diff', 'share_diff', 'view_diff']
+        values = interaction_data[growth_columns].to_numpy(dtype=np.float64)
+        growth = np.full_like(values, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(values[1:], values[:-1], out=growth[1:])
+        growth[1:] -= 1
+        growth[1:] *= 100
+        interaction_data[[f'{col}_growth' for col in growth_columns]] = growth
         
         return interaction_data
     
@@ -666,7 +911,7 @@ class TikTokDataProcessor:
         if date is None:
             date = self.merged_df['date'].max()
         
-        daily_data = self.merged_df[self.merged_df['date'] == date].copy()
+        daily_data = self.get_daily_data(date)
         
         if daily_data.empty:
             print(f"❌ 指定日期 {date} 没有数据")
@@ -677,9 +922,9 @@ class TikTokDataProcessor:
             return None
         
         # 获取 Top 账号
-        top_accounts = daily_data.nlargest(top_n, metric)[
+        top_accounts = self.get_top_rows(daily_data, metric, top_n)[
             ['user_id', 'group', 'view_diff', 'like_diff', 'comment_diff', 'share_diff']
-        ].copy()
+        ]
         
         # 获取账号详情
         account_details = self.get_account_details(top_accounts['user_id'].tolist())
@@ -694,9 +939,8 @@ class TikTokDataProcessor:
             )
             
             # 生成 TikTok 链接
-            top_accounts['tiktok_url'] = top_accounts['Tiktok Username'].apply(
-                lambda x: f"https://www.tiktok.com/@{x}" if pd.notna(x) else None
-            )
+            usernames = top_accounts['Tiktok Username']
+            top_accounts['tiktok_url'] = ('https://www.tiktok.com/@' + usernames.astype(str)).where(usernames.notna(), None)
         
         return top_accounts
 
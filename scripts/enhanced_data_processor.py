@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 import warnings
 import os
 import re
+import traceback
 from typing import Dict, List, Optional, Tuple
 warnings.filterwarnings('ignore')
 
@@ -16,7 +17,8 @@ class EnhancedTikTokDataProcessor:
                  clicks_data_dir: str = 'data/clicks',
                  accounts_df: pd.DataFrame = None,
                  redash_df: pd.DataFrame = None,
-                 clicks_df: pd.DataFrame = None):
+                 clicks_df: pd.DataFrame = None,
+                 debug: bool = False):
         """
         初始化增强版数据处理器
         
@@ -24,14 +26,23 @@ class EnhancedTikTokDataProcessor:
             redash_data_dir (str): redash 数据目录路径
             accounts_file_path (str): accounts detail 数据文件路径
             clicks_data_dir (str): clicks 数据目录路径
+            debug (bool): 是否在页面上输出调试信息
         """
         self.redash_data_dir = redash_data_dir
         self.accounts_file_path = accounts_file_path
         self.clicks_data_dir = clicks_data_dir
+        self.debug = debug
         
         # 数据存储
         self.merged_df = None
         self.group_mapping = None
+        self.group_lookup = None
+        self.group_lookup_source = None
+        self.available_groups = None
+        self.available_groups_source = None
+        self.merge_key = None
+        self.date_min = None
+        self.date_max = None
         self.clicks_df = clicks_df
         self.accounts_df = accounts_df
         self.redash_df = redash_df
@@ -76,13 +87,13 @@ class EnhancedTikTokDataProcessor:
             redash_df = pd.read_csv(file_path, low_memory=False)
             print("Redash columns:", redash_df.columns.tolist())
             
-            # 数据预处理
+            # 数据预处理：日期只在加载时解析一次，之后 date 列始终是 datetime64 且不含 NaT
             if 'YMDdate' in redash_df.columns:
-                redash_df['date'] = pd.to_datetime(redash_df['YMDdate'], errors='coerce')
+                redash_df['date'] = self.parse_date_column(redash_df['YMDdate'])
             elif 'date' in redash_df.columns:
-                redash_df['date'] = pd.to_datetime(redash_df['date'], errors='coerce')
+                redash_df['date'] = self.parse_date_column(redash_df['date'])
             
-            redash_df = redash_df.dropna(subset=['date'])
+            redash_df = redash_df.loc[redash_df['date'].notna()]
             
             # 确保 user_id 为字符串类型
             redash_df['user_id'] = redash_df['user_id'].astype(str)
@@ -188,50 +199,56 @@ class EnhancedTikTokDataProcessor:
     def merge_data(self) -> bool:
         """合并所有数据"""
         try:
+            # 输入数据未变化且已有合并结果时直接复用，不再重复类型转换和映射
+            merge_key = self.get_merge_key()
+            if merge_key is not None and merge_key == self.merge_key and self.merged_df is not None:
+                print("[DEBUG] 输入数据未变化，跳过合并")
+                return True
+            
             print("正在合并数据...")
             import streamlit as st
-            st.write("[DEBUG] 正在合并数据...")
-            st.write("[DEBUG] merge_data() 方法开始执行")
+            self.debug_write("[DEBUG] 正在合并数据...")
+            self.debug_write("[DEBUG] merge_data() 方法开始执行")
             
             # 确保在云端也能看到调试信息
             import sys
-            st.write(f"[DEBUG] Python路径: {sys.path[:3]}")  # 显示前3个路径
+            self.debug_write(f"[DEBUG] Python路径: {sys.path[:3]}")  # 显示前3个路径
             
             # 优先用传入的 DataFrame
-            st.write("[DEBUG] 开始获取 redash_df...")
+            self.debug_write("[DEBUG] 开始获取 redash_df...")
             redash_df = self.redash_df if self.redash_df is not None else self.load_latest_redash_data()
             print(f"[DEBUG] redash_df shape: {redash_df.shape if redash_df is not None else 'None'}")
-            st.write(f"[DEBUG] redash_df shape: {redash_df.shape if redash_df is not None else 'None'}")
+            self.debug_write(f"[DEBUG] redash_df shape: {redash_df.shape if redash_df is not None else 'None'}")
             
-            st.write("[DEBUG] 开始处理 accounts_df...")
+            self.debug_write("[DEBUG] 开始处理 accounts_df...")
             group_mapping = None
             if self.accounts_df is not None:
                 print(f"[DEBUG] 使用传入的 accounts_df, shape: {self.accounts_df.shape}")
-                st.write(f"[DEBUG] 使用传入的 accounts_df, shape: {self.accounts_df.shape}")
+                self.debug_write(f"[DEBUG] 使用传入的 accounts_df, shape: {self.accounts_df.shape}")
                 accounts_df = self.accounts_df
                 print(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
-                st.write(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
+                self.debug_write(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
                 # 检查必要的列是否存在
                 if 'Tiktok ID' not in accounts_df.columns or 'Groups' not in accounts_df.columns:
                     print(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
                     st.error(f"[DEBUG] accounts_df columns: {accounts_df.columns.tolist()}")
                     raise ValueError("accounts_df 缺少必要的列: 'Tiktok ID' 或 'Groups'")
-                # 强制类型转换
-                accounts_df['Tiktok ID'] = accounts_df['Tiktok ID'].astype(str)
+                # 强制类型转换（字符串类别，只对去重后的 ID 做 str 转换）
+                accounts_df['Tiktok ID'] = self.to_str_categorical(accounts_df['Tiktok ID'])
                 print(f"[DEBUG] accounts_df['Tiktok ID'] dtype: {accounts_df['Tiktok ID'].dtype}")
-                st.write(f"[DEBUG] accounts_df['Tiktok ID'] dtype: {accounts_df['Tiktok ID'].dtype}")
-                print(f"[DEBUG] accounts_df['Tiktok ID'] sample: {accounts_df['Tiktok ID'].unique()[:5]}")
-                st.write(f"[DEBUG] accounts_df['Tiktok ID'] sample: {accounts_df['Tiktok ID'].unique()[:5]}")
+                self.debug_write(f"[DEBUG] accounts_df['Tiktok ID'] dtype: {accounts_df['Tiktok ID'].dtype}")
+                if self.debug:
+                    print(f"[DEBUG] accounts_df['Tiktok ID'] sample: {accounts_df['Tiktok ID'].unique()[:5]}")
+                    st.write(f"[DEBUG] accounts_df['Tiktok ID'] sample: {accounts_df['Tiktok ID'].unique()[:5]}")
                 group_mapping = accounts_df[['Tiktok ID', 'Groups']].drop_duplicates()
                 group_mapping = group_mapping.rename(columns={'Tiktok ID': 'user_id', 'Groups': 'group'})
-                group_mapping['user_id'] = group_mapping['user_id'].astype(str)
                 group_mapping['group'] = group_mapping['group'].fillna('Unknown')
                 print(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
-                st.write(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
+                self.debug_write(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
             else:
                 group_mapping = self.load_accounts_data()
                 print(f"[DEBUG] 从文件加载 group_mapping, shape: {group_mapping.shape if group_mapping is not None else 'None'}")
-                st.write(f"[DEBUG] 从文件加载 group_mapping, shape: {group_mapping.shape if group_mapping is not None else 'None'}")
+                self.debug_write(f"[DEBUG] 从文件加载 group_mapping, shape: {group_mapping.shape if group_mapping is not None else 'None'}")
             
             clicks_df = self.clicks_df if self.clicks_df is not None else self.load_clicks_data()
             print(f"[DEBUG] clicks_df shape: {clicks_df.shape if clicks_df is not None else 'None'}")
@@ -256,51 +273,53 @@ class EnhancedTikTokDataProcessor:
                 return False
             
             print(f"[DEBUG] 开始合并，redash_df columns: {redash_df.columns.tolist()}")
-            st.write(f"[DEBUG] 开始合并，redash_df columns: {redash_df.columns.tolist()}")
+            self.debug_write(f"[DEBUG] 开始合并，redash_df columns: {redash_df.columns.tolist()}")
             print(f"[DEBUG] group_mapping columns: {group_mapping.columns.tolist()}")
-            st.write(f"[DEBUG] group_mapping columns: {group_mapping.columns.tolist()}")
+            self.debug_write(f"[DEBUG] group_mapping columns: {group_mapping.columns.tolist()}")
             
             # 确保 redash_df 有正确的 date 列
             if 'date' not in redash_df.columns:
                 print("[DEBUG] redash_df 缺少 'date' 列，尝试从其他列创建...")
-                st.write("[DEBUG] redash_df 缺少 'date' 列，尝试从其他列创建...")
+                self.debug_write("[DEBUG] redash_df 缺少 'date' 列，尝试从其他列创建...")
                 if 'YMDdate' in redash_df.columns:
-                    redash_df['date'] = pd.to_datetime(redash_df['YMDdate'], errors='coerce')
+                    redash_df['date'] = self.parse_date_column(redash_df['YMDdate'])
                     print("[DEBUG] 从 'YMDdate' 列创建 'date' 列")
-                    st.write("[DEBUG] 从 'YMDdate' 列创建 'date' 列")
+                    self.debug_write("[DEBUG] 从 'YMDdate' 列创建 'date' 列")
                 else:
                     print("[DEBUG] redash_df 缺少日期列，实际列: ", redash_df.columns.tolist())
                     st.error("[DEBUG] redash_df 缺少日期列，实际列: " + str(redash_df.columns.tolist()))
                     raise ValueError("redash_df 缺少日期列")
             
-            # 确保 date 列是 datetime 类型
+            # 确保 date 列是 datetime 类型（load_latest_redash_data 已解析过的数据直接跳过）
             if not pd.api.types.is_datetime64_any_dtype(redash_df['date']):
-                redash_df['date'] = pd.to_datetime(redash_df['date'], errors='coerce')
+                redash_df['date'] = self.parse_date_column(redash_df['date'])
             
             # 移除无效的日期行
-            redash_df = redash_df.dropna(subset=['date'])
+            if redash_df['date'].hasnans:
+                redash_df = redash_df.loc[redash_df['date'].notna()]
             print(f"[DEBUG] 处理日期后 redash_df shape: {redash_df.shape}")
-            st.write(f"[DEBUG] 处理日期后 redash_df shape: {redash_df.shape}")
+            self.debug_write(f"[DEBUG] 处理日期后 redash_df shape: {redash_df.shape}")
             
             # 强制类型转换
             if 'user_id' in redash_df.columns:
                 # 确保 user_id 列的数据类型一致
                 print(f"[DEBUG] redash_df['user_id'] 原始 dtype: {redash_df['user_id'].dtype}")
-                st.write(f"[DEBUG] redash_df['user_id'] 原始 dtype: {redash_df['user_id'].dtype}")
+                self.debug_write(f"[DEBUG] redash_df['user_id'] 原始 dtype: {redash_df['user_id'].dtype}")
                 
-                redash_df['user_id'] = redash_df['user_id'].astype(str)
+                redash_df['user_id'] = self.to_str_categorical(redash_df['user_id'])
                 print(f"[DEBUG] redash_df['user_id'] 转换后 dtype: {redash_df['user_id'].dtype}")
-                st.write(f"[DEBUG] redash_df['user_id'] 转换后 dtype: {redash_df['user_id'].dtype}")
+                self.debug_write(f"[DEBUG] redash_df['user_id'] 转换后 dtype: {redash_df['user_id'].dtype}")
                 
-                print(f"[DEBUG] redash_df['user_id'] sample: {redash_df['user_id'].unique()[:5]}")
-                st.write(f"[DEBUG] redash_df['user_id'] sample: {redash_df['user_id'].unique()[:5]}")
+                if self.debug:
+                    print(f"[DEBUG] redash_df['user_id'] sample: {redash_df['user_id'].unique()[:5]}")
+                    st.write(f"[DEBUG] redash_df['user_id'] sample: {redash_df['user_id'].unique()[:5]}")
             else:
                 print("[DEBUG] redash_df 缺少 'user_id' 列，实际列: ", redash_df.columns.tolist())
                 st.error("[DEBUG] redash_df 缺少 'user_id' 列，实际列: " + str(redash_df.columns.tolist()))
                 raise ValueError("redash_df 缺少 'user_id' 列")
             
             # 合并 redash 和 accounts 数据
-            st.write("[DEBUG] 开始执行 merge 操作...")
+            self.debug_write("[DEBUG] 开始执行 merge 操作...")
             print("[DEBUG] 准备执行 merge 操作...")
             print(f"[DEBUG] redash_df shape: {redash_df.shape}")
             print(f"[DEBUG] group_mapping shape: {group_mapping.shape}")
@@ -308,16 +327,26 @@ class EnhancedTikTokDataProcessor:
             print(f"[DEBUG] group_mapping['user_id'] 前5个值: {group_mapping['user_id'].head().tolist()}")
             
             try:
-                merged_df = redash_df.merge(group_mapping, on='user_id', how='left')
+                # user_id 与 group_mapping 共享类别，map 只需对去重后的类别做一次查找
+                group_mapping['user_id'] = self.to_str_categorical(group_mapping['user_id'])
+                user_categories = pd.api.types.union_categoricals([
+                    redash_df['user_id'].array,
+                    group_mapping['user_id'].array
+                ], sort_categories=True).categories
+                redash_df['user_id'] = redash_df['user_id'].cat.set_categories(user_categories)
+                group_mapping['user_id'] = group_mapping['user_id'].cat.set_categories(user_categories)
+                # group_mapping 是按 user_id 的查找表，用 map 代替整表 merge
+                merged_df = redash_df.assign(group=redash_df['user_id'].map(self.get_group_lookup(group_mapping)))
                 print(f"[DEBUG] 合并后 shape: {merged_df.shape}")
-                st.write(f"[DEBUG] 合并后 shape: {merged_df.shape}")
+                self.debug_write(f"[DEBUG] 合并后 shape: {merged_df.shape}")
                 print(f"[DEBUG] merged_df columns: {merged_df.columns.tolist()}")
-                st.write(f"[DEBUG] merged_df columns: {merged_df.columns.tolist()}")
-                print(f"[DEBUG] merged_df['group'] value_counts: {merged_df['group'].value_counts(dropna=False) if 'group' in merged_df.columns else '无group列'}")
-                st.write(f"[DEBUG] merged_df['group'] value_counts: {merged_df['group'].value_counts(dropna=False) if 'group' in merged_df.columns else '无group列'}")
-                print(f"[DEBUG] merged_df head:\n{merged_df.head()}")
-                st.write(f"[DEBUG] merged_df head:")
-                st.dataframe(merged_df.head())
+                self.debug_write(f"[DEBUG] merged_df columns: {merged_df.columns.tolist()}")
+                if self.debug:
+                    print(f"[DEBUG] merged_df['group'] value_counts: {merged_df['group'].value_counts(dropna=False) if 'group' in merged_df.columns else '无group列'}")
+                    st.write(f"[DEBUG] merged_df['group'] value_counts: {merged_df['group'].value_counts(dropna=False) if 'group' in merged_df.columns else '无group列'}")
+                    print(f"[DEBUG] merged_df head:\n{merged_df.head()}")
+                    st.write(f"[DEBUG] merged_df head:")
+                    st.dataframe(merged_df.head())
             except Exception as merge_error:
                 print(f"[DEBUG] merge 操作失败: {str(merge_error)}")
                 st.error(f"[DEBUG] merge 操作失败: {str(merge_error)}")
@@ -326,18 +355,22 @@ class EnhancedTikTokDataProcessor:
             # 强制统一分组字段名为 group
             if 'Groups' in merged_df.columns:
                 merged_df = merged_df.rename(columns={'Groups': 'group'})
-            merged_df['group'] = merged_df['group'].fillna('Unknown')
+            merged_df['group'] = merged_df['group'].fillna('Unknown').astype('category')
+            if 'username' in merged_df.columns:
+                merged_df['username'] = merged_df['username'].astype('category')
 
             self.merged_df = merged_df
+            self.update_date_range()
             self.group_mapping = group_mapping
             self.clicks_df = clicks_df
+            # 在类型转换之后记录指纹，下次以相同输入调用时即可命中
+            self.merge_key = self.get_merge_key()
             
             print(f"✅ 数据合并成功: {merged_df.shape}")
             st.success(f"✅ 数据合并成功: {merged_df.shape}")
             return True
             
         except Exception as e:
-            import traceback
             error_msg = f"❌ 数据合并失败: {str(e)}"
             error_traceback = traceback.format_exc()
             print(error_msg)
@@ -347,12 +380,93 @@ class EnhancedTikTokDataProcessor:
             self.merged_df = None
             return False
     
+    def get_merge_key(self) -> Optional[Tuple]:
+        """
+        计算合并输入的指纹：两张表的形状 + 关联键的哈希
+        
+        仅在 redash_df 和 accounts_df 都由调用方传入时可用，从文件加载的情况返回 None。
+        """
+        if self.redash_df is None or self.accounts_df is None or 'Tiktok ID' not in self.accounts_df.columns:
+            return None
+        accounts_hash = int(pd.util.hash_pandas_object(self.accounts_df['Tiktok ID'], index=False).sum())
+        return (self.redash_df.shape, self.accounts_df.shape, accounts_hash)
+    
+    def debug_write(self, *args) -> None:
+        """仅在调试模式下把调试信息输出到页面"""
+        if self.debug:
+            import streamlit as st
+            st.write(*args)
+    
+    @staticmethod
+    def to_str_categorical(values: pd.Series) -> pd.Series:
+        """
+        把关联键转为字符串类别列，取值与 astype(str) 一致
+        
+        先按原始类型去重编码，只对去重后的值做 str 转换，行级数据保持为整数编码，
+        关联时按编码而不是逐行的 Python 字符串做哈希。
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(values.cat.categories):
+            return values
+        if values.hasnans:
+            # 缺失值按 astype(str) 的原有语义处理
+            return values.astype(str).astype('category')
+        codes, uniques = pd.factorize(values)
+        categories = pd.Index(uniques).astype(str)
+        if not categories.is_unique:
+            # 例如 1 和 '1' 混在同一列，转成字符串后会重复，退回逐行转换
+            return values.astype(str).astype('category')
+        return pd.Series(pd.Categorical.from_codes(codes, categories=categories),
+                         index=values.index, name=values.name)
+    
+    @staticmethod
+    def parse_date_column(values: pd.Series) -> pd.Series:
+        """
+        把日期字符串列解析为 datetime64，无法解析的值为 NaT
+
+        优先按 %Y-%m-%d 走显式格式的快速路径，格式不符时再退回自动推断。
+        """
+        try:
+            return pd.to_datetime(values, format='%Y-%m-%d', cache=True)
+        except (ValueError, TypeError):
+            return pd.to_datetime(values, errors='coerce', cache=True)
+    
+    def update_date_range(self) -> None:
+        """一次扫描计算 merged_df 的日期范围，保存到 date_min/date_max 供重复使用"""
+        if self.merged_df is None or self.merged_df.empty:
+            self.date_min = None
+            self.date_max = None
+            return
+        self.date_min, self.date_max = self.merged_df['date'].agg(['min', 'max'])
+    
+    def get_group_lookup(self, group_mapping: pd.DataFrame) -> pd.Series:
+        """
+        构建 user_id -> group 的查找表（每个 user_id 只保留第一条），同一份 group_mapping 只构建一次
+        
+        Args:
+            group_mapping (pd.DataFrame): 包含 user_id 和 group 列的映射表
+        
+        Returns:
+            pd.Series: 以 user_id 为索引的 group 查找表
+        """
+        if self.group_lookup is None or self.group_lookup_source is not group_mapping:
+            self.group_lookup = group_mapping.drop_duplicates('user_id').set_index('user_id')['group']
+            self.group_lookup_source = group_mapping
+        return self.group_lookup
+    
     def get_available_groups(self) -> List[str]:
-        """获取所有可用的分组（支持模糊匹配）"""
+        """获取所有可用的分组（支持模糊匹配），同一份 merged_df 只计算一次"""
         if self.merged_df is None:
             return []
         
-        all_groups_raw = self.merged_df['group'].dropna().unique().tolist()
+        if self.available_groups is not None and self.available_groups_source is self.merged_df:
+            return self.available_groups
+        
+        # group 为分类类型时直接取类别，无需逐行扫描
+        group_col = self.merged_df['group']
+        if isinstance(group_col.dtype, pd.CategoricalDtype):
+            all_groups_raw = group_col.cat.categories.tolist()
+        else:
+            all_groups_raw = group_col.dropna().unique().tolist()
         split_groups = set()
         
         for g in all_groups_raw:
@@ -362,7 +476,9 @@ class EnhancedTikTokDataProcessor:
                     if part:
                         split_groups.add(part)
         
-        return sorted(list(split_groups))
+        self.available_groups = sorted(list(split_groups))
+        self.available_groups_source = self.merged_df
+        return self.available_groups
     
     def filter_data_by_groups(self, df: pd.DataFrame, selected_groups: List[str]) -> pd.DataFrame:
         """
@@ -452,7 +568,7 @@ class EnhancedTikTokDataProcessor:
         
         # 分组每日聚合
         metrics = ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']
-        group_daily_data = filtered_df.groupby(['date', 'group'])[metrics].sum().reset_index()
+        group_daily_data = filtered_df.groupby(['date', 'group'], observed=True)[metrics].sum().reset_index()
         
         return group_daily_data
     
@@ -501,10 +617,10 @@ class EnhancedTikTokDataProcessor:
         daily_clicks['clicks_growth'] = daily_clicks['clicks_count'].pct_change() * 100
         
         # 按页面类型统计
-        page_type_clicks = filtered_clicks.groupby('page_type').size().reset_index(name='clicks_count')
+        page_type_clicks = filtered_clicks.groupby('page_type', observed=True).size().reset_index(name='clicks_count')
         
         # 按链接统计
-        link_clicks = filtered_clicks.groupby('page_url').size().reset_index(name='clicks_count')
+        link_clicks = filtered_clicks.groupby('page_url', observed=True).size().reset_index(name='clicks_count')
         
         return {
             'daily_clicks': daily_clicks,
@@ -586,8 +702,8 @@ class EnhancedTikTokDataProcessor:
         if group_daily.empty:
             return pd.DataFrame()
         
-        # 确保 clicks_df['date'] 为 pd.Timestamp 类型
-        self.clicks_df['date'] = pd.to_datetime(self.clicks_df['date'])
+        # clicks_df['date'] 按 pd.Timestamp 类型比较（不修改 self.clicks_df，避免影响后续调用）
+        clicks_dates = pd.to_datetime(self.clicks_df['date'])
         group_daily['date'] = pd.to_datetime(group_daily['date'])
         
         # 按链接映射分组
@@ -600,11 +716,12 @@ class EnhancedTikTokDataProcessor:
             
             if not group_data.empty:
                 # 获取该链接的点击数据
-                link_clicks = self.clicks_df[
+                link_mask = (
                     (self.clicks_df['page_url'].str.contains(link, case=False, na=False)) &
-                    (self.clicks_df['date'] >= group_data['date'].min()) &
-                    (self.clicks_df['date'] <= group_data['date'].max())
-                ]
+                    (clicks_dates >= group_data['date'].min()) &
+                    (clicks_dates <= group_data['date'].max())
+                )
+                link_clicks = self.clicks_df[link_mask].assign(date=clicks_dates[link_mask])
                 
                 if not link_clicks.empty:
                     daily_link_clicks = link_clicks.groupby('date').size().reset_index(name='link_clicks')
@@ -629,9 +746,9 @@ class EnhancedTikTokDataProcessor:
         
         try:
             import streamlit as st
-            st.write("[DEBUG] 开始获取数据摘要...")
-            st.write(f"[DEBUG] merged_df columns: {self.merged_df.columns.tolist()}")
-            st.write(f"[DEBUG] merged_df shape: {self.merged_df.shape}")
+            self.debug_write("[DEBUG] 开始获取数据摘要...")
+            self.debug_write(f"[DEBUG] merged_df columns: {self.merged_df.columns.tolist()}")
+            self.debug_write(f"[DEBUG] merged_df shape: {self.merged_df.shape}")
             
             # 检查必要的列是否存在
             if 'date' not in self.merged_df.columns:
@@ -651,7 +768,7 @@ class EnhancedTikTokDataProcessor:
             # 获取日期范围
             date_min = self.merged_df['date'].min()
             date_max = self.merged_df['date'].max()
-            st.write(f"[DEBUG] 日期范围: {date_min} 到 {date_max}")
+            self.debug_write(f"[DEBUG] 日期范围: {date_min} 到 {date_max}")
             
             summary = {
                 'total_records': len(self.merged_df),
@@ -683,7 +800,7 @@ class EnhancedTikTokDataProcessor:
             if yesterday_comparison:
                 summary['yesterday_comparison'] = yesterday_comparison
             
-            st.write("[DEBUG] 数据摘要获取成功")
+            self.debug_write("[DEBUG] 数据摘要获取成功")
             return summary
             
         except Exception as e:
@@ -834,7 +951,7 @@ class EnhancedTikTokDataProcessor:
         df = self.merged_df.copy()
         df = df.sort_values(['user_id', 'date'])
         for col in ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']:
-            diff = df.groupby('user_id')[col].diff()
+            diff = df.groupby('user_id', observed=True)[col].diff()
             if not isinstance(diff, pd.Series):
                 diff = pd.Series([0.0]*len(df), index=df.index)
             else:
@@ -858,25 +975,27 @@ class EnhancedTikTokDataProcessor:
         """
         if self.merged_df is None:
             return pd.DataFrame()
-        df = self.merged_df.copy()
+        metric_cols = ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']
+        df = self.merged_df[['date', 'user_id', 'group'] + metric_cols]
         if groups:
             df = self.filter_data_by_groups(df, groups)
         df = df.sort_values(['user_id', 'date'])
-        for col in ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']:
-            diff = df.groupby('user_id')[col].diff()
-            if not isinstance(diff, pd.Series):
-                diff = pd.Series([0.0]*len(df), index=df.index)
-            else:
-                diff = pd.Series(diff.values, index=df.index)
-            diff = diff.fillna(0)
-            df[f'{col}_inc'] = diff
+        # 已按 user_id+date 排序：五个指标堆成一个矩阵做一次相邻差分，每个账号的第一行记为 0
+        values = df[metric_cols].to_numpy(dtype='float64')
+        increments = np.zeros_like(values)
+        if len(values) > 1:
+            user_codes = pd.factorize(df['user_id'])[0]
+            increments[1:] = values[1:] - values[:-1]
+            increments[1:][user_codes[1:] != user_codes[:-1]] = 0
+            increments[np.isnan(increments)] = 0
+        df = df.assign(**{f'{col}_inc': increments[:, i] for i, col in enumerate(metric_cols)})
         if start_date:
             start_date = pd.Timestamp(start_date)
             df = df[df['date'] >= start_date]
         if end_date:
             end_date = pd.Timestamp(end_date)
             df = df[df['date'] <= end_date]
-        agg = df.groupby(['date', 'group'])[['view_count_inc', 'like_count_inc', 'comment_count_inc', 'share_count_inc', 'post_count_inc']].sum().reset_index()
+        agg = df.groupby(['date', 'group'], observed=True)[['view_count_inc', 'like_count_inc', 'comment_count_inc', 'share_count_inc', 'post_count_inc']].sum().reset_index()
         all_dates = pd.date_range(df['date'].min(), df['date'].max())
         all_groups = agg['group'].unique()
         idx = pd.MultiIndex.from_product([all_dates, all_groups], names=['date', 'group'])
@@ -886,6 +1005,11 @@ class EnhancedTikTokDataProcessor:
     def get_link_conversion_analysis(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
         """
         获取 insnap.ai 链接每日点击与浏览趋势分析数据，包含PV（点击量）和UV（独立访客数）
+        
+        Returns:
+            Dict: {链接: 分析结果}。每个结果的 'data' 一定是 DataFrame，且包含
+                  date、daily_clicks、daily_visitors、daily_views（int64）以及
+                  daily_pv_conversion_rate、daily_uv_conversion_rate 列，调用方无需再校验。
         """
         if self.clicks_df is None or self.merged_df is None:
             return {}
@@ -895,67 +1019,90 @@ class EnhancedTikTokDataProcessor:
             'https://insnap.ai/zh/download': 'wan_produce101'
         }
         result = {}
+        start_date_ts = pd.Timestamp(start_date) if start_date else None
+        end_date_ts = pd.Timestamp(end_date) if end_date else None
+        # 点击数据的日期只需解析一次，所有链接共用
+        if 'timestamp' in self.clicks_df.columns:
+            clicks_dates = pd.to_datetime(self.clicks_df['timestamp']).dt.date
+        elif 'date' in self.clicks_df.columns:
+            clicks_dates = pd.to_datetime(self.clicks_df['date']).dt.date
+        else:
+            clicks_dates = None
+        
+        # 所有链接的每日 PV/UV 在一次 (link, date) 分组聚合中算完，循环内只按链接取结果
+        if clicks_dates is not None:
+            url_to_link = {}
+            for link_url in link_group_mapping:
+                url_to_link[link_url] = link_url
+                url_to_link[link_url.replace('https://', 'http://')] = link_url
+                url_to_link[link_url.replace('http://', 'https://')] = link_url
+            link_col = self.clicks_df['page_url'].astype(object).map(url_to_link)
+            url_mask = link_col.notna()
+            if start_date_ts is not None:
+                url_mask &= clicks_dates >= start_date_ts.date()
+            if end_date_ts is not None:
+                url_mask &= clicks_dates <= end_date_ts.date()
+            all_link_clicks = self.clicks_df.loc[url_mask, ['session_id', 'visitor_id']].assign(
+                link=link_col[url_mask], date=clicks_dates[url_mask]
+            )
+            # 每日点击量（PV, session_id去重）和访客数（UV, visitor_id去重）
+            link_daily = all_link_clicks.groupby(['link', 'date']).agg(
+                daily_clicks=('session_id', 'nunique'),
+                daily_visitors=('visitor_id', 'nunique')
+            )
+            # 整个区间的去重总量不能由每日数据相加得到，单独按链接聚合一次
+            link_totals = all_link_clicks.groupby('link').agg(
+                total_clicks=('session_id', 'nunique'),
+                total_visitors=('visitor_id', 'nunique')
+            )
+        
+        # 浏览量的日期筛选和类型转换对所有链接只做一次，循环内只按分组取子集聚合
+        views_dates = pd.to_datetime(self.merged_df['date'])
+        views_mask = pd.Series(True, index=self.merged_df.index)
+        if start_date_ts is not None:
+            views_mask &= views_dates >= start_date_ts
+        if end_date_ts is not None:
+            views_mask &= views_dates <= end_date_ts
+        views_df = self.merged_df.loc[views_mask]
+        views_days = views_dates[views_mask].dt.date
+        # 用 view_diff 字段，若无则全为 0
+        if 'view_diff' in views_df.columns:
+            views_diff = pd.to_numeric(views_df['view_diff'], errors='coerce').fillna(0)
+        else:
+            print(f"⚠️ merged_df 无 view_diff 字段，全部视为 0")
+            views_diff = None
+        
         for link_url, target_group in link_group_mapping.items():
             print(f"🔍 分析链接: {link_url} -> 目标分组: {target_group}")
             # 1. 获取链接点击数据
-            link_clicks = self.clicks_df.copy()
-            if 'timestamp' in link_clicks.columns:
-                link_clicks['date'] = pd.to_datetime(link_clicks['timestamp']).dt.date
-            elif 'date' in link_clicks.columns:
-                link_clicks['date'] = pd.to_datetime(link_clicks['date']).dt.date
-            else:
+            if clicks_dates is None:
                 print(f"❌ 点击数据中未找到时间字段")
                 continue
-            http_link = link_url.replace('https://', 'http://')
-            https_link = link_url.replace('http://', 'https://')
-            link_clicks = link_clicks[
-                (link_clicks['page_url'] == link_url) |
-                (link_clicks['page_url'] == http_link) |
-                (link_clicks['page_url'] == https_link)
-            ].copy()
-            if start_date:
-                start_date_ts = pd.Timestamp(start_date)
-                link_clicks = link_clicks[link_clicks['date'] >= start_date_ts.date()]
-            if end_date:
-                end_date_ts = pd.Timestamp(end_date)
-                link_clicks = link_clicks[link_clicks['date'] <= end_date_ts.date()]
-            
-            # 每日点击量（PV）和访客数（UV）
-            if not link_clicks.empty:
-                # 每日点击量（PV）- session_id去重
-                daily_clicks = link_clicks.groupby('date')['session_id'].nunique().reset_index(name='daily_clicks')
-                daily_clicks['date'] = pd.to_datetime(daily_clicks['date'])
-                
-                # 每日访客数（UV）- visitor_id去重
-                daily_visitors = link_clicks.groupby('date')['visitor_id'].nunique().reset_index(name='daily_visitors')
-                daily_visitors['date'] = pd.to_datetime(daily_visitors['date'])
-                
-                # 合并PV和UV数据
-                daily_pv_uv = pd.merge(daily_clicks, daily_visitors, on='date', how='outer').fillna(0)
+            
+            if link_url in link_totals.index:
+                daily_pv_uv = link_daily.loc[link_url].reset_index()
+                daily_pv_uv['date'] = pd.to_datetime(daily_pv_uv['date'])
+                total_clicks = int(link_totals.at[link_url, 'total_clicks'])
+                total_visitors = int(link_totals.at[link_url, 'total_visitors'])
             else:
                 daily_pv_uv = pd.DataFrame(columns=['date', 'daily_clicks', 'daily_visitors'])
+                total_clicks = 0
+                total_visitors = 0
             
             # 2. 获取目标分组的每日浏览量（view_diff）
-            group_views = self.merged_df.copy()
-            group_views['date'] = pd.to_datetime(group_views['date'])
-            group_views = group_views[group_views['group'].str.contains(target_group, na=False, case=False)]
-            if start_date:
-                group_views = group_views[group_views['date'] >= start_date_ts]
-            if end_date:
-                group_views = group_views[group_views['date'] <= end_date_ts]
-            # 用 view_diff 字段，若无则全为 0
-            if 'view_diff' in group_views.columns:
-                group_views['view_diff'] = pd.to_numeric(group_views['view_diff'], errors='coerce').fillna(0)
-                daily_views = group_views.groupby(group_views['date'].dt.date)['view_diff'].sum().reset_index()
+            group_mask = views_df['group'].str.contains(target_group, na=False, case=False)
+            if views_diff is not None:
+                daily_views = views_diff[group_mask].groupby(views_days[group_mask]).sum().reset_index()
                 daily_views.columns = ['date', 'daily_views']
                 daily_views['date'] = pd.to_datetime(daily_views['date'])
             else:
-                print(f"⚠️ merged_df 无 view_diff 字段，全部视为 0")
                 daily_views = pd.DataFrame(columns=['date', 'daily_views'])
             
             # 3. 合并所有数据
             merged_data = pd.merge(daily_pv_uv, daily_views, on='date', how='outer').fillna(0)
             merged_data['date'] = pd.to_datetime(merged_data['date']).dt.date
+            # 计数列统一为 int64（外连接补 0 后会变成 float）
+            merged_data = merged_data.astype(dict.fromkeys(['daily_clicks', 'daily_visitors', 'daily_views'], 'int64'))
             
             # 4. 计算每日转化率
             merged_data['daily_pv_conversion_rate'] = merged_data.apply(
@@ -988,9 +1135,9 @@ class EnhancedTikTokDataProcessor:
             # 7. 汇总结果
             result[link_url] = {
                 'target_group': target_group,
-                'total_clicks': int(link_clicks['session_id'].nunique()) if not link_clicks.empty else 0,
-                'total_visitors': int(link_clicks['visitor_id'].nunique()) if not link_clicks.empty else 0,
-                'total_views': int(group_views['view_count'].sum()) if 'view_count' in group_views.columns else 0,
+                'total_clicks': total_clicks,
+                'total_visitors': total_visitors,
+                'total_views': int(views_df.loc[group_mask, 'view_count'].sum()) if 'view_count' in views_df.columns else 0,
                 'avg_pv_conversion_rate': merged_data['daily_pv_conversion_rate'].mean() if not merged_data.empty else 0.0,
                 'avg_uv_conversion_rate': merged_data['daily_uv_conversion_rate'].mean() if not merged_data.empty else 0.0,
                 'data': merged_data,
@@ -1198,7 +1345,6 @@ class EnhancedTikTokDataProcessor:
             
         except Exception as e:
             print(f'❌ get_last_day_clicks_summary error: {e}')
-            import traceback
             traceback.print_exc()
             return {}
 
@@ -1218,18 +1364,17 @@ class EnhancedTikTokDataProcessor:
             return pd.DataFrame()
         
         try:
-            # 筛选日期范围
-            df = self.merged_df.copy()
+            # 筛选日期范围（只构造布尔掩码，不复制整表）
+            dates = self.merged_df['date']
+            date_mask = np.ones(len(dates), dtype=bool)
             if start_date:
-                start_date_ts = pd.Timestamp(start_date)
-                df = df[df['date'] >= start_date_ts]
+                date_mask &= (dates >= pd.Timestamp(start_date)).to_numpy()
             if end_date:
-                end_date_ts = pd.Timestamp(end_date)
-                df = df[df['date'] <= end_date_ts]
+                date_mask &= (dates <= pd.Timestamp(end_date)).to_numpy()
             
             # 只取最后一天的数据
-            last_date = df['date'].max()
-            last_day_data = df[df['date'] == last_date].copy()
+            last_date = dates[date_mask].max()
+            last_day_data = self.merged_df.loc[date_mask & (dates == last_date).to_numpy()]
             
             print(f"📅 使用最后一天数据: {last_date.strftime('%Y-%m-%d')}")
             
@@ -1240,19 +1385,20 @@ class EnhancedTikTokDataProcessor:
             # 按user_id聚合最后一天的view_diff
             if 'view_diff' in last_day_data.columns:
                 # 确保view_diff为数值类型
-                last_day_data['view_diff'] = pd.to_numeric(last_day_data['view_diff'], errors='coerce').fillna(0)
+                last_day_data = last_day_data.assign(view_diff=pd.to_numeric(last_day_data['view_diff'], errors='coerce').fillna(0))
                 
                 # 按user_id聚合最后一天的数据
-                account_performance = last_day_data.groupby('user_id').agg({
+                account_performance = last_day_data.groupby('user_id', observed=True).agg({
                     'view_diff': 'sum'  # 只统计最后一天的新增浏览量
                 }).reset_index()
                 
-                # 按view_diff降序排序，取前N个
-                account_performance = account_performance.sort_values('view_diff', ascending=False).head(top_n)
+                # 取view_diff最大的前N个（堆选择，不对全部账号排序）
+                account_performance = account_performance.nlargest(top_n, 'view_diff')
                 
-                # 准备accounts_df用于合并
-                accounts_info = self.accounts_df.copy()
-                accounts_info['user_id'] = accounts_info['Tiktok ID'].astype(str)
+                # 准备accounts_df用于合并（只取需要的列）
+                accounts_info = self.accounts_df[['Tiktok Username', 'Total Followers', 'Total Like']].assign(
+                    user_id=self.accounts_df['Tiktok ID'].astype(str)
+                )
                 
                 # 合并账号信息
                 result = account_performance.merge(
@@ -1266,10 +1412,9 @@ class EnhancedTikTokDataProcessor:
                 result['Total Followers'] = pd.to_numeric(result['Total Followers'], errors='coerce').fillna(0)
                 result['Total Like'] = pd.to_numeric(result['Total Like'], errors='coerce').fillna(0)
                 
-                # 构造主页链接
-                result['profile_url'] = result['Tiktok Username'].apply(
-                    lambda x: f"https://www.tiktok.com/@{x}" if x != '未知' else ''
-                )
+                # 构造主页链接（向量化字符串拼接，未知用户名留空）
+                usernames = result['Tiktok Username'].astype(str)
+                result['profile_url'] = np.where(usernames != '未知', 'https://www.tiktok.com/@' + usernames, '')
                 
                 # 重命名列
                 result = result.rename(columns={
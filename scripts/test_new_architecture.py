@@ -230,6 +230,276 @@ def test_clicks_analyzer():
         print(f"❌ Clicks 分析器功能测试失败: {str(e)}")
         return False
 
+def test_clicks_parquet_cache_dtypes():
+    """测试 CSV 的 Parquet 缓存：冷加载（解析 CSV）与热加载（读缓存）得到的列类型和数据相同"""
+    print("🔧 测试 CSV Parquet 缓存...")
+    
+    try:
+        import tempfile
+        from clicks_analyzer import ClicksAnalyzer
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            clicks_path = os.path.join(tmp_dir, 'clicks.csv')
+            merged_path = os.path.join(tmp_dir, 'merged.csv')
+            # 整数 ID 和只有日期的时间列是 Parquet 不能原样还原的两种情况
+            pd.DataFrame({
+                'timestamp': ['2025-07-01 08:00:00', '2025-07-01 09:30:00', '2025-07-02 10:00:00'],
+                'session_id': [101, 102, 101],
+                'visitor_id': [7, 8, 7],
+                'page_url': ['/videos/1', '/download', '/videos/2'],
+                'page_type': ['videos', 'download', 'videos']
+            }).to_csv(clicks_path, index=False)
+            pd.DataFrame({
+                'date': ['2025-07-01', '2025-07-01', '2025-07-02'],
+                'user_id': [1001, 1002, 1001],
+                'group': ['main_avatar', 'wan_produce101', 'main_avatar'],
+                'view_diff': [100, 200, 150],
+                'like_diff': [10, 20, 15],
+                'comment_diff': [5, 10, 7],
+                'share_diff': [2, 5, 3]
+            }).to_csv(merged_path, index=False)
+        
+            loads = []
+            for _ in range(2):
+                analyzer = ClicksAnalyzer(clicks_file_path=clicks_path, merged_data_path=merged_path)
+                assert analyzer.load_clicks_data()
+                assert analyzer.load_merged_data()
+                loads.append((analyzer.clicks_df, analyzer.merged_df))
+        
+            assert os.path.exists(clicks_path + '.parquet')
+            assert os.path.exists(merged_path + '.parquet')
+            (cold_clicks, cold_merged), (warm_clicks, warm_merged) = loads
+            pd.testing.assert_frame_equal(cold_clicks, warm_clicks)
+            pd.testing.assert_frame_equal(cold_merged, warm_merged)
+            for col in ['session_id', 'visitor_id', 'page_type']:
+                assert isinstance(warm_clicks[col].dtype, pd.CategoricalDtype)
+            assert isinstance(warm_merged['user_id'].dtype, pd.CategoricalDtype)
+        
+        print("✅ CSV Parquet 缓存测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ CSV Parquet 缓存测试失败: {str(e)}")
+        return False
+
+def make_processor_test_data(seed=0, n=400):
+    """生成带重复值、空值和类别列的合并数据，用于对比各优化路径与原 pandas 写法"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2025-07-01', periods=6)
+    data = pd.DataFrame({
+        'date': rng.choice(dates, n),
+        'user_id': pd.Categorical(rng.choice([f'u{i}' for i in range(40)], n)),
+        'group': pd.Categorical(rng.choice(['g1', 'g2', 'g3', 'Unknown'], n)),
+        'view_count': rng.integers(0, 5000, n),
+        'post_count': rng.integers(0, 50, n),
+        'like_count': rng.integers(0, 500, n),
+        'comment_count': rng.integers(0, 100, n),
+        'share_count': rng.integers(0, 50, n),
+        'view_diff': rng.integers(0, 20, n),
+        'like_diff': rng.integers(0, 20, n),
+        'comment_diff': rng.integers(0, 5, n),
+        'share_diff': rng.integers(0, 5, n),
+        'post_diff': rng.integers(0, 3, n)
+    })
+    for col in ['view_per_post', 'like_per_post', 'comment_per_post', 'share_per_post']:
+        values = rng.random(n) * 100
+        values[rng.random(n) < 0.1] = np.nan
+        data[col] = values
+    return data
+
+def make_test_processor(merged_df):
+    """不读文件，直接挂上合并数据的处理器"""
+    from data_processor import TikTokDataProcessor
+    
+    processor = TikTokDataProcessor(redash_file_path=None, accounts_file_path=None)
+    processor.merged_df = merged_df
+    processor.diff_columns = [col for col in merged_df.columns if col.endswith('_diff')]
+    return processor
+
+def test_daily_data_matches_filter():
+    """测试 get_daily_data 按排序后二分查找切出的数据与布尔筛选结果相同"""
+    print("📅 测试按天切片...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        for date in data['date'].unique():
+            expected = data[data['date'] == date]
+            pd.testing.assert_frame_equal(processor.get_daily_data(date), expected)
+        
+        # 不存在的日期返回空表
+        assert processor.get_daily_data(pd.Timestamp('2024-01-01')).empty
+        
+        print("✅ 按天切片测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 按天切片测试失败: {str(e)}")
+        return False
+
+def test_daily_cube_matches_groupby():
+    """测试由 (date, group) 合计表得到的每日合计与按原始数据 groupby.sum 相同"""
+    print("🧮 测试每日合计表...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        metrics = ['view_count', 'like_count', 'comment_count', 'share_count', 'post_count']
+        expected = data.groupby('date')[metrics].sum().reset_index()
+        pd.testing.assert_frame_equal(processor.get_daily_aggregates(), expected)
+        
+        for groups in [None, ['g1', 'Unknown']]:
+            filtered = data if groups is None else data[data['group'].isin(groups)]
+            expected = filtered.groupby(['date', 'group'], observed=True)['view_diff'].sum().reset_index()
+            result = processor.get_daily_diff_metrics('view_diff', groups)
+            pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+        
+        print("✅ 每日合计表测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 每日合计表测试失败: {str(e)}")
+        return False
+
+def test_count_unique_accounts():
+    """测试 count_unique_accounts 与 groupby.nunique 结果相同"""
+    print("👥 测试账号去重计数...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        for keys in [['group'], ['date', 'group']]:
+            pd.testing.assert_series_equal(
+                processor.count_unique_accounts(data, keys),
+                data.groupby(keys, observed=True)['user_id'].nunique()
+            )
+        
+        print("✅ 账号去重计数测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 账号去重计数测试失败: {str(e)}")
+        return False
+
+def test_top_rows_matches_nlargest():
+    """测试 get_top_rows 与 nlargest 结果一致（包括并列和空值）"""
+    print("🏆 测试 Top N 选取...")
+    
+    try:
+        rng = np.random.default_rng(1)
+        processor = make_test_processor(make_processor_test_data())
+        for trial in range(300):
+            n = int(rng.integers(0, 30))
+            df = pd.DataFrame({'metric': rng.integers(0, 5, n).astype(float)})
+            df.loc[rng.random(n) < 0.2, 'metric'] = np.nan
+            if trial % 2:
+                df['metric'] = df['metric'].astype('Int64')
+            top_n = int(rng.integers(0, 35))
+            expected = df.nlargest(top_n, 'metric')
+            result = processor.get_top_rows(df, 'metric', top_n)
+            assert result.index.equals(expected.index), f"第 {trial} 组 (top_n={top_n}) 顺序不一致"
+        
+        print("✅ Top N 选取测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Top N 选取测试失败: {str(e)}")
+        return False
+
+def test_write_csv_matches_to_csv():
+    """测试 pyarrow 写出的 CSV 用 read_csv 读回后与 to_csv 的结果相同"""
+    print("💾 测试 CSV 写出...")
+    
+    try:
+        import tempfile
+        
+        data = make_processor_test_data()
+        data['username'] = pd.Series([f'name,{i}' if i % 7 else None for i in range(len(data))], dtype=object)
+        processor = make_test_processor(data)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            expected_path = os.path.join(tmp_dir, 'expected.csv')
+            result_path = os.path.join(tmp_dir, 'result.csv')
+            data.to_csv(expected_path, index=False)
+            assert processor.save_merged_data(result_path)
+            pd.testing.assert_frame_equal(pd.read_csv(result_path), pd.read_csv(expected_path))
+        
+        print("✅ CSV 写出测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ CSV 写出测试失败: {str(e)}")
+        return False
+
+def test_efficiency_metrics_match_mean():
+    """测试由合计表的 合计 / 非空个数 推出的每日均值与 groupby.mean 相同"""
+    print("⚡ 测试每日效率均值...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        for metric in ['view_per_post', 'like_per_post', 'view_diff']:
+            expected = data.groupby('date')[metric].mean().reset_index()
+            pd.testing.assert_frame_equal(processor.get_efficiency_metrics(metric), expected,
+                                          check_exact=False, rtol=1e-12)
+        
+        print("✅ 每日效率均值测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 每日效率均值测试失败: {str(e)}")
+        return False
+
+def test_diff_summary_matches_groupby():
+    """测试每日 _diff 汇总与按天切片后 groupby.sum 相同"""
+    print("📈 测试新增量汇总...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        for date in data['date'].unique():
+            day = data[data['date'] == date]
+            expected = day.groupby('group', observed=True)[processor.diff_columns].sum().reset_index()
+            pd.testing.assert_frame_equal(processor.get_diff_metrics_summary(date), expected)
+        
+        print("✅ 新增量汇总测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 新增量汇总测试失败: {str(e)}")
+        return False
+
+def test_group_performance_matches_agg():
+    """测试分组表现：合计列与 groupby.sum 相同，均值列与 groupby.mean 相同"""
+    print("📊 测试分组表现...")
+    
+    try:
+        data = make_processor_test_data()
+        processor = make_test_processor(data)
+        
+        for date in data['date'].unique():
+            day = data[data['date'] == date]
+            expected = day.groupby('group', observed=True).agg({
+                'view_count': 'sum', 'post_count': 'sum', 'like_count': 'sum',
+                'comment_count': 'sum', 'share_count': 'sum',
+                'view_per_post': 'mean', 'like_per_post': 'mean',
+                'comment_per_post': 'mean', 'share_per_post': 'mean'
+            }).round(2).reset_index().sort_values('view_count', ascending=False)
+            result = processor.get_group_performance(date)
+            pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                          check_exact=True)
+        
+        print("✅ 分组表现测试通过")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 分组表现测试失败: {str(e)}")
+        return False
+
 def main():
     """主测试函数"""
     print("🚀 开始测试新架构功能...")
@@ -239,7 +509,16 @@ def main():
         test_mapping_config,
         test_data_processor,
         test_visualization_utils,
-        test_clicks_analyzer
+        test_clicks_analyzer,
+        test_clicks_parquet_cache_dtypes,
+        test_daily_data_matches_filter,
+        test_daily_cube_matches_groupby,
+        test_count_unique_accounts,
+        test_top_rows_matches_nlargest,
+        test_write_csv_matches_to_csv,
+        test_efficiency_metrics_match_mean,
+        test_diff_summary_matches_groupby,
+        test_group_performance_matches_agg
     ]
     
     passed = 0